@@ -0,0 +1,421 @@
+"""
+Асинхронный режим работы бота.
+
+Опрос API Практикума, обработчики команд и отправка сообщений
+работают в одном цикле событий asyncio без отдельных потоков.
+"""
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+from telebot import asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+
+from conditional import fingerprint
+from dispatch import Dispatcher
+from exceptions import APIResponseError, HomeworkBotError
+from homeworks import HomeworkDiff
+from outbound import AsyncOutboundQueue, retry_after
+from ratelimit import BACKGROUND, INTERACTIVE, AsyncRateLimiter
+from render import status_keyboard
+from resilience import Backoff, is_service_failure
+from singleflight import AsyncSingleFlight
+
+from homework import (
+    ALLOWED_UPDATES,
+    ENDPOINT,
+    HEADERS,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_READ_TIMEOUT,
+    LAST_POLL,
+    OUTBOUND_QUEUE_SIZE,
+    POLL_CYCLE_SECONDS,
+    POLL_ERROR_BACKOFF_BASE,
+    POLL_ERROR_BACKOFF_CAP,
+    PRACTICUM_BURST,
+    PRACTICUM_SECONDS,
+    PRACTICUM_RATE,
+    PRACTICUM_TOKEN,
+    PRACTICUM_TOKEN_BURST,
+    PRACTICUM_TOKEN_RATE,
+    STATUS_BUTTON,
+    STATUS_CHATS,
+    TEMPLATES,
+    TELEGRAM_CHAT_ID,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_GROUP_RATE,
+    TELEGRAM_TOKEN,
+    TELEGRAM_WORKERS,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    build_status_message,
+    check_response,
+    count_practicum_response,
+    conditional_cache,
+    homework_indexes,
+    outbox_drainer,
+    poll_scheduler,
+    practicum_breaker,
+    queue_changes,
+    response_cache,
+    state_store,
+    status_refreshes,
+    status_replies,
+    status_window_start,
+    telegram_breaker,
+    webhook_server,
+)
+
+bot = AsyncTeleBot(TELEGRAM_TOKEN)
+dispatcher = Dispatcher()
+
+
+class AsyncPracticumClient:
+    """Асинхронный клиент API Практикума с общим пулом соединений."""
+
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=30.0):
+        """Сохраняет настройки; сессия создаётся в работающем цикле."""
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout)
+        self._session = None
+        self._flight = AsyncSingleFlight()
+        self._limiter = AsyncRateLimiter(
+            PRACTICUM_RATE, PRACTICUM_BURST,
+            PRACTICUM_TOKEN_RATE, PRACTICUM_TOKEN_BURST,
+        )
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.timeout,
+                headers=HEADERS,
+            )
+        return self._session
+
+    async def _request_api_answer(self, timestamp, priority, poll):
+        key = (PRACTICUM_TOKEN, timestamp)
+        params = {'from_date': timestamp}
+        headers = conditional_cache.request_headers(key) if poll else {}
+        await self._limiter.acquire(PRACTICUM_TOKEN, priority)
+        # Проба предохранителя не должна ждать токена: отмена в ожидании
+        # оставила бы её занятой
+        practicum_breaker.before_call()
+        started = time.monotonic()
+        try:
+            async with self._get_session().get(
+                    ENDPOINT, params=params, headers=headers) as response:
+                count_practicum_response(response.status)
+                if is_service_failure(response.status):
+                    practicum_breaker.on_failure()
+                else:
+                    practicum_breaker.on_success()
+                if poll and response.status == 304:
+                    answer = conditional_cache.not_modified(key)
+                    if answer is not None:
+                        response_cache.put(PRACTICUM_TOKEN, timestamp, answer)
+                        return answer, False
+                if response.status != 200:
+                    raise APIResponseError(
+                        f'Ошибка API: {response.status}, '
+                        f'{await response.text()}')
+                body = await response.read()
+                response_headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            count_practicum_response('error')
+            practicum_breaker.on_failure()
+            raise APIResponseError(f'Ошибка запроса: {error}')
+        except asyncio.CancelledError:
+            practicum_breaker.release()
+            raise
+        finally:
+            PRACTICUM_SECONDS.observe(time.monotonic() - started)
+        if not poll:
+            answer = json.loads(body)
+            response_cache.put(PRACTICUM_TOKEN, timestamp, answer)
+            return answer, True
+
+        # Тот же ответ, что и в прошлый раз, не разбираем заново
+        digest = fingerprint(body)
+        answer = conditional_cache.match(key, digest)
+        changed = answer is None
+        if changed:
+            answer = json.loads(body)
+            conditional_cache.remember(key, response_headers, digest, answer)
+        response_cache.put(PRACTICUM_TOKEN, timestamp, answer)
+        return answer, changed
+
+    async def fetch_api_answer(self, timestamp, priority=BACKGROUND,
+                               poll=False):
+        """
+        Запрашивает ответ API и признак его изменения с прошлого раза.
+
+        poll=True только у опроса: его ответ ждёт подтверждения commit().
+        """
+        return await self._flight.do(
+            (PRACTICUM_TOKEN, timestamp, poll),
+            self._request_api_answer, timestamp, priority, poll)
+
+    async def get_api_answer(self, timestamp, priority=BACKGROUND):
+        """Запрашивает статус домашней работы через API."""
+        answer, _ = await self.fetch_api_answer(timestamp, priority)
+        return answer
+
+    async def _refresh_cached_answer(self, timestamp):
+        try:
+            await self.get_api_answer(timestamp)
+        except HomeworkBotError as error:
+            logging.error(f'Не удалось обновить кэш: {error}')
+        finally:
+            response_cache.end_refresh(PRACTICUM_TOKEN, timestamp)
+
+    async def get_cached_api_answer(self, timestamp):
+        """Возвращает ответ API из кэша, при промахе запрашивает его."""
+        cached = response_cache.get(PRACTICUM_TOKEN, timestamp)
+        if cached is None:
+            return await self.get_api_answer(timestamp, INTERACTIVE)
+        answer, stale = cached
+        if stale and response_cache.begin_refresh(PRACTICUM_TOKEN, timestamp):
+            asyncio.create_task(self._refresh_cached_answer(timestamp))
+        return answer
+
+    async def close(self):
+        """Закрывает сессию и все её соединения."""
+        if self._session is not None:
+            await self._session.close()
+
+
+practicum = AsyncPracticumClient(
+    pool_size=HTTP_POOL_SIZE,
+    connect_timeout=HTTP_CONNECT_TIMEOUT,
+    read_timeout=HTTP_READ_TIMEOUT,
+)
+
+
+def is_telegram_failure(error):
+    """Проверяет, вызвана ли ошибка отправки сбоем самого Telegram."""
+    if isinstance(error, asyncio_helper.ApiTelegramException):
+        return is_service_failure(error.error_code)
+    if isinstance(error, asyncio_helper.ApiHTTPException):
+        return is_service_failure(error.result.status)
+    return True
+
+
+async def deliver_message(chat_id, text, **kwargs):
+    """Отправляет сообщение в Telegram; ошибки пробрасываются."""
+    telegram_breaker.before_call()
+    try:
+        await bot.send_message(chat_id, text, **kwargs)
+    except asyncio.CancelledError:
+        telegram_breaker.release()
+        raise
+    except Exception as error:
+        # Сетевые сбои AsyncTeleBot — RequestTimeout, а не ApiException;
+        # на 429 отвечают паузой, сбоем Telegram он не считается
+        if retry_after(error) is None and is_telegram_failure(error):
+            telegram_breaker.on_failure()
+        else:
+            telegram_breaker.on_success()
+        raise
+    telegram_breaker.on_success()
+    logging.info(f'Бот отправил сообщение: {text}')
+
+
+outbound_queue = AsyncOutboundQueue(
+    deliver_message,
+    workers=TELEGRAM_WORKERS,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    group_rate=TELEGRAM_GROUP_RATE,
+    max_size=OUTBOUND_QUEUE_SIZE,
+)
+
+
+def reply(chat_id, text, **kwargs):
+    """Ставит ответ пользователю в очередь, не дожидаясь отправки."""
+    outbound_queue.enqueue(chat_id, text, **kwargs)
+
+
+async def send_homework_status(chat_id=TELEGRAM_CHAT_ID):
+    """Отправляет статус домашней работы пользователю."""
+    refresh = status_refreshes.allow(chat_id)
+    try:
+        index = homework_indexes.for_token(PRACTICUM_TOKEN)
+        if refresh:
+            poll_scheduler.reset()
+            timestamp = status_window_start()
+            response = await practicum.get_cached_api_answer(timestamp)
+            index.update(check_response(response))
+        message = build_status_message(index.latest())
+    except HomeworkBotError as error:
+        message = TEMPLATES.text('status_error', error=error)
+    except Exception as error:
+        message = TEMPLATES.text('unexpected_error', error=error)
+
+    reply(chat_id, message)
+
+
+async def request_status(message):
+    """Отправляет статус в чат, из которого пришёл запрос."""
+    chat_id = message.chat.id
+    if not status_replies.allow(chat_id):
+        return
+    if str(chat_id) not in STATUS_CHATS:
+        reply(chat_id, TEMPLATES.text('owner_only'))
+        return
+    await send_homework_status(chat_id)
+
+
+@dispatcher.command('status')
+async def handle_status(message):
+    """Обработчик команды /status."""
+    await request_status(message)
+
+
+@dispatcher.text(STATUS_BUTTON)
+async def handle_button_status(message):
+    """Обработчик кнопки проверки статуса."""
+    await request_status(message)
+
+
+@dispatcher.fallback
+async def send_status_keyboard(message):
+    """Отправляет клавиатуру с кнопкой проверки статуса."""
+    reply(
+        message.chat.id,
+        TEMPLATES.text('keyboard_prompt'),
+        reply_markup=status_keyboard()
+    )
+
+
+@bot.message_handler(content_types=dispatcher.content_types())
+async def dispatch_message(message):
+    """Передаёт сообщение обработчику из таблицы диспетчера."""
+    handling = dispatcher.dispatch(message)
+    if handling is not None:
+        await handling
+
+
+# Отправляемые сейчас сообщения из outbox
+_deliveries = set()
+
+
+async def deliver_outbox_message(message, wakeup):
+    """Отправляет одно сообщение из outbox и учитывает итог."""
+    _, chat_id, text = message
+    try:
+        delivered = await outbound_queue.enqueue(chat_id, text)
+    except Exception as error:
+        # Любой исход снимает отметку отправки, иначе чат считается
+        # занятым и больше не получает уведомлений
+        outbox_drainer.settle(message, False, error)
+    else:
+        outbox_drainer.settle(message, delivered)
+    wakeup.set()
+
+
+async def drain_outbox(wakeup):
+    """Отправляет уведомления из outbox, включая оставшиеся до рестарта."""
+    while True:
+        wakeup.clear()
+        # Чтение SQLite не должно блокировать цикл событий
+        messages, wait = await asyncio.to_thread(outbox_drainer.batch)
+        # Чаты получают сообщения параллельно, медленный не держит других
+        for message in messages:
+            outbox_drainer.begin(message)
+            task = asyncio.create_task(
+                deliver_outbox_message(message, wakeup))
+            # Цикл событий хранит только слабые ссылки на задачи
+            _deliveries.add(task)
+            task.add_done_callback(_deliveries.discard)
+        try:
+            await asyncio.wait_for(wakeup.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def poll_homeworks(outbox_wakeup):
+    """Периодически опрашивает API и уведомляет об изменении статуса."""
+    # После перезапуска продолжаем с сохранённого курсора
+    saved_cursor = state_store.get_cursor(TELEGRAM_CHAT_ID)
+    timestamp = saved_cursor[0] if saved_cursor else int(time.time())
+    homework_diff = HomeworkDiff(state_store.get_statuses(TELEGRAM_CHAT_ID))
+    error_backoff = Backoff(POLL_ERROR_BACKOFF_BASE, POLL_ERROR_BACKOFF_CAP)
+
+    while True:
+        started = time.monotonic()
+        try:
+            response, changed = await practicum.fetch_api_answer(
+                timestamp, poll=True)
+            LAST_POLL.set(time.time())
+            if not changed:
+                # Ответ не изменился: проверка и сортировка не нужны, а
+                # планировщику он говорит то же, что и в прошлый раз
+                poll_scheduler.observe(response['homeworks'])
+                logging.info('Новых статусов нет')
+            else:
+                homeworks = check_response(response)
+                current_timestamp = response.get(
+                    'current_date', int(time.time()))
+                poll_scheduler.observe(homeworks)
+                homework_indexes.for_token(PRACTICUM_TOKEN).update(homeworks)
+
+                changes = homework_diff.diff(homeworks)
+                queue_changes(TELEGRAM_CHAT_ID, homework_diff, changes)
+                # Ответ обработан: такой же больше не разбираем
+                conditional_cache.commit((PRACTICUM_TOKEN, timestamp))
+                if changes:
+                    outbox_wakeup.set()
+                    timestamp = current_timestamp
+                    state_store.set_cursor(
+                        TELEGRAM_CHAT_ID, timestamp, changes[-1].new_status)
+                else:
+                    logging.info('Новых статусов нет')
+        except Exception as error:
+            POLL_CYCLE_SECONDS.observe(time.monotonic() - started)
+            logging.error(f'Ошибка: {error}')
+            await poll_scheduler.async_sleep(error_backoff.next_delay())
+        else:
+            POLL_CYCLE_SECONDS.observe(time.monotonic() - started)
+            error_backoff.reset()
+            await poll_scheduler.async_sleep()
+
+
+async def main():
+    """Запускает приём обновлений и опрос API в одном цикле событий."""
+    server = polling = None
+    if WEBHOOK_URL:
+        server = webhook_server(bot.process_new_updates)
+        await server.start(WEBHOOK_HOST, WEBHOOK_PORT)
+        await bot.set_webhook(
+            url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES)
+    else:
+        await bot.remove_webhook()
+        polling = asyncio.create_task(bot.infinity_polling(
+            timeout=30, allowed_updates=ALLOWED_UPDATES))
+    outbox_wakeup = asyncio.Event()
+    draining = asyncio.create_task(drain_outbox(outbox_wakeup))
+    try:
+        await poll_homeworks(outbox_wakeup)
+    finally:
+        if server is not None:
+            await server.stop()
+        if polling is not None:
+            polling.cancel()
+        draining.cancel()
+        await practicum.close()
+        await bot.close_session()
+
+
+def run():
+    """Точка входа асинхронного режима."""
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Микробенчмарк маршрутизации сообщений.
+
+Сравнивает таблицы Dispatcher с последовательной проверкой фильтров,
+как это делает telebot, на смеси команд, нажатий кнопки, прочего
+текста и нетекстовых сообщений. Пример:
+
+    python bench_dispatch.py 200000
+"""
+import random
+import sys
+import time
+
+from types import SimpleNamespace
+
+from dispatch import Dispatcher
+
+BUTTON = 'Проверить статус домашнего задания'
+
+
+def make_messages(count, seed=1):
+    """Возвращает смесь сообщений разных видов."""
+    rng = random.Random(seed)
+    samples = [
+        ('text', '/status'),
+        ('text', '/status@homework_bot'),
+        ('text', BUTTON),
+        ('text', '  проверить  статус домашнего задания '),
+        ('text', 'привет'),
+        ('text', 'длинное сообщение ' * 50),
+        ('photo', None),
+        ('sticker', None),
+    ]
+    return [
+        SimpleNamespace(content_type=content_type, text=text)
+        for content_type, text in (rng.choice(samples) for _ in range(count))
+    ]
+
+
+def make_dispatcher():
+    """Собирает диспетчер с обработчиками бота."""
+    dispatcher = Dispatcher()
+    dispatcher.command('status')(lambda message: 'status')
+    dispatcher.text(BUTTON)(lambda message: 'button')
+    dispatcher.fallback(lambda message: 'keyboard')
+    return dispatcher
+
+
+def linear_route(message):
+    """Последовательная проверка фильтров обработчиков, как в telebot."""
+    filters = (
+        (lambda m: m.content_type == 'text'
+         and (m.text or '').split(maxsplit=1)[0].split('@')[0] == '/status',
+         'status'),
+        (lambda m: m.content_type == 'text'
+         and (m.text or '').lower() == BUTTON.lower(),
+         'button'),
+        (lambda m: m.content_type == 'text', 'keyboard'),
+    )
+    for matches, handler in filters:
+        if matches(message):
+            return handler
+    return None
+
+
+def measure(route, messages):
+    """Возвращает наносекунды на одно сообщение."""
+    started = time.perf_counter_ns()
+    for message in messages:
+        route(message)
+    return (time.perf_counter_ns() - started) / len(messages)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    messages = make_messages(count)
+    dispatcher = make_dispatcher()
+    for name, route in (('таблицы', dispatcher.route),
+                        ('перебор', linear_route)):
+        per_message = measure(route, messages)
+        print(f'{name}: {per_message:.0f} нс на сообщение, '
+              f'{1e9 / per_message:,.0f} сообщений в секунду')
@@ -0,0 +1,101 @@
+"""
+Доска статусов: одно закреплённое сообщение на чат.
+
+Вместо новых сообщений бот правит закреплённое через
+edit_message_text, и только если текст действительно изменился:
+хэш последнего отправленного текста хранится вместе с id сообщения.
+Если сообщение удалили, бот отправляет и закрепляет новое.
+"""
+import hashlib
+import logging
+
+from telebot import apihelper
+
+from metrics import REGISTRY
+
+EDITS = REGISTRY.counter(
+    'status_board_total', 'Обновления доски статусов.',
+    labels={'result': 'edited'})
+SKIPPED = REGISTRY.counter(
+    'status_board_total', 'Обновления доски статусов.',
+    labels={'result': 'unchanged'})
+CREATED = REGISTRY.counter(
+    'status_board_total', 'Обновления доски статусов.',
+    labels={'result': 'created'})
+
+# Ответы Telegram, после которых доску нужно создать заново
+MISSING_MESSAGE = (
+    'message to edit not found',
+    "message can't be edited",
+)
+
+
+def _description(error):
+    return (error.result_json or {}).get('description', '').lower()
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _direct(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+class StatusBoard:
+    """Закреплённые сообщения со статусами, по одному на чат."""
+
+    def __init__(self, store, bot, call=_direct):
+        """
+        Создаёт доску; store хранит id сообщений и хэши текста.
+
+        call(func, *args, **kwargs) выполняет каждый вызов Telegram API,
+        например через предохранитель.
+        """
+        self.store = store
+        self.bot = bot
+        self._call = call
+
+    def _edit(self, chat_id, message_id, text):
+        """Правит доску; False — сообщения больше нет."""
+        try:
+            self._call(self.bot.edit_message_text, text, chat_id, message_id)
+        except apihelper.ApiTelegramException as error:
+            description = _description(error)
+            if 'message is not modified' in description:
+                SKIPPED.inc()
+                return True
+            if any(reason in description for reason in MISSING_MESSAGE):
+                return False
+            raise
+        EDITS.inc()
+        return True
+
+    def show(self, chat_id, text, force=False):
+        """
+        Приводит доску чата к тексту text.
+
+        Вызывается из очереди отправки, поэтому вызовы для одного чата
+        не пересекаются. force пропускает сверку хэша, чтобы по запросу
+        пользователя проверить, что сообщение доски ещё существует.
+        """
+        digest = _digest(text)
+        board = self.store.get_board(chat_id)
+        if board is not None:
+            message_id, old_digest = board
+            if old_digest == digest and not force:
+                SKIPPED.inc()
+                return
+            if self._edit(chat_id, message_id, text):
+                self.store.set_board(chat_id, message_id, digest)
+                return
+        message = self._call(self.bot.send_message, chat_id, text)
+        CREATED.inc()
+        self.store.set_board(chat_id, message.message_id, digest)
+        try:
+            self._call(
+                self.bot.pin_chat_message,
+                chat_id, message.message_id, disable_notification=True)
+        except apihelper.ApiException as error:
+            # В группе у бота может не быть права закреплять сообщения
+            logging.warning(f'Не удалось закрепить доску статусов: {error}')
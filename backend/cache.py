@@ -0,0 +1,120 @@
+"""Кэш ответов API Практикума с TTL и stale-while-revalidate."""
+import threading
+import time
+
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter(
+    'practicum_cache_hits_total', 'Свежие ответы, отданные из кэша.')
+CACHE_STALE_HITS = REGISTRY.counter(
+    'practicum_cache_stale_hits_total',
+    'Устаревшие ответы, отданные из кэша с фоновым обновлением.')
+CACHE_MISSES = REGISTRY.counter(
+    'practicum_cache_misses_total', 'Запросы, не найденные в кэше.')
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    'practicum_cache_hit_ratio',
+    'Доля запросов, обслуженных кэшем, включая устаревшие ответы.')
+
+
+def hit_ratio():
+    """Возвращает долю попаданий в кэш за всё время работы."""
+    hits = CACHE_HITS.value + CACHE_STALE_HITS.value
+    total = hits + CACHE_MISSES.value
+    return hits / total if total else 0.0
+
+
+CACHE_HIT_RATIO.set_function(hit_ratio)
+
+
+class ResponseCache:
+    """
+    Кэш ответов API, общий для фонового опроса и обработчиков /status.
+
+    Ключ — токен и окно from_date, округлённое до window секунд.
+    Ответ, запрошенный с более ранним from_date, покрывает и более
+    поздние окна, поэтому нажатие кнопки может быть обслужено данными,
+    которые только что получил фоновый опрос.
+    """
+
+    def __init__(self, ttl=60, stale_ttl=600, window=60, max_tokens=1024,
+                 clock=time.monotonic):
+        """Создаёт пустой кэш."""
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.window = max(int(window), 1)
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _bucket(self, from_date):
+        return int(from_date) // self.window
+
+    def get(self, token, from_date):
+        """
+        Ищет ответ, покрывающий окно from_date.
+
+        Возвращает пару (ответ, устарел ли он) или None при промахе.
+        """
+        bucket = self._bucket(from_date)
+        now = self._clock()
+        with self._lock:
+            buckets = self._entries.get(token)
+            best = None
+            if buckets:
+                self._entries.move_to_end(token)
+                for entry_bucket, (fetched_at, response) in buckets.items():
+                    if entry_bucket > bucket:
+                        continue
+                    if best is None or fetched_at > best[0]:
+                        best = (fetched_at, response)
+        if best is None or now - best[0] >= self.ttl + self.stale_ttl:
+            CACHE_MISSES.inc()
+            return None
+        if now - best[0] < self.ttl:
+            CACHE_HITS.inc()
+            return best[1], False
+        CACHE_STALE_HITS.inc()
+        return best[1], True
+
+    def put(self, token, from_date, response):
+        """Сохраняет ответ и удаляет просроченные записи токена."""
+        now = self._clock()
+        with self._lock:
+            buckets = self._entries.setdefault(token, {})
+            self._entries.move_to_end(token)
+            buckets[self._bucket(from_date)] = (now, response)
+            expired = [
+                entry_bucket
+                for entry_bucket, (fetched_at, _) in buckets.items()
+                if now - fetched_at >= self.ttl + self.stale_ttl
+            ]
+            for entry_bucket in expired:
+                del buckets[entry_bucket]
+            while len(self._entries) > self.max_tokens:
+                self._entries.popitem(last=False)
+
+    def begin_refresh(self, token, from_date):
+        """Отмечает начало фонового обновления; False — уже обновляется."""
+        key = (token, self._bucket(from_date))
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, token, from_date):
+        """Снимает отметку о фоновом обновлении."""
+        with self._lock:
+            self._refreshing.discard((token, self._bucket(from_date)))
+
+    def stats(self):
+        """Возвращает счётчики попаданий и промахов."""
+        return {
+            'hits': CACHE_HITS.value,
+            'stale_hits': CACHE_STALE_HITS.value,
+            'misses': CACHE_MISSES.value,
+        }
@@ -0,0 +1,132 @@
+"""
+Быстрый путь для неизменившихся ответов API Практикума.
+
+Если сервер отдаёт ETag или Last-Modified, запрос повторяется условным
+(If-None-Match / If-Modified-Since) и ответ 304 не скачивается целиком.
+Иначе тело ответа сравнивается по хэшу с прошлым, и совпавший ответ
+не разбирается заново. В хэш не входит current_date: время сервера
+меняется в каждом ответе.
+
+Разобранный ответ становится образцом для сравнения только после
+commit(), то есть когда его изменения обработаны. Если обработка
+сорвалась, следующий такой же ответ снова считается изменившимся.
+"""
+import hashlib
+import re
+import threading
+
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+FAST_PATH_NOT_MODIFIED = REGISTRY.counter(
+    'practicum_fast_path_total',
+    'Циклы опроса, пропустившие разбор неизменившегося ответа.',
+    labels={'reason': 'not_modified'})
+FAST_PATH_FINGERPRINT = REGISTRY.counter(
+    'practicum_fast_path_total',
+    'Циклы опроса, пропустившие разбор неизменившегося ответа.',
+    labels={'reason': 'fingerprint'})
+FULL_PARSES = REGISTRY.counter(
+    'practicum_full_parse_total', 'Ответы API, разобранные полностью.')
+FAST_PATH_RATIO = REGISTRY.gauge(
+    'practicum_fast_path_ratio',
+    'Доля ответов API, не потребовавших полного разбора.')
+
+
+def fast_path_ratio():
+    """Возвращает долю ответов, обработанных быстрым путём."""
+    fast = FAST_PATH_NOT_MODIFIED.value + FAST_PATH_FINGERPRINT.value
+    total = fast + FULL_PARSES.value
+    return fast / total if total else 0.0
+
+
+FAST_PATH_RATIO.set_function(fast_path_ratio)
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*-?\d+')
+
+
+def fingerprint(body):
+    """Возвращает короткий хэш тела ответа без поля current_date."""
+    return hashlib.blake2b(
+        CURRENT_DATE.sub(b'', body), digest_size=16).digest()
+
+
+class _Entry:
+    __slots__ = ('etag', 'last_modified', 'digest', 'answer')
+
+    def __init__(self, etag, last_modified, digest, answer):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.answer = answer
+
+
+class ConditionalCache:
+    """Валидаторы и хэши последних ответов для каждого ключа запроса."""
+
+    def __init__(self, max_entries=4096):
+        """Создаёт пустое хранилище не больше max_entries ключей."""
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+
+    def request_headers(self, key):
+        """Возвращает заголовки условного запроса для ключа."""
+        with self._lock:
+            entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def not_modified(self, key):
+        """Возвращает прошлый ответ после 304 Not Modified."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        FAST_PATH_NOT_MODIFIED.inc()
+        return entry.answer
+
+    def match(self, key, digest):
+        """Возвращает прошлый ответ, если хэш тела не изменился."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry.digest != digest:
+            return None
+        FAST_PATH_FINGERPRINT.inc()
+        return entry.answer
+
+    def _put(self, entries, key, entry):
+        entries[key] = entry
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def remember(self, key, headers, digest, answer):
+        """Запоминает разобранный ответ до подтверждения через commit()."""
+        FULL_PARSES.inc()
+        entry = _Entry(
+            headers.get('ETag'), headers.get('Last-Modified'), digest, answer)
+        with self._lock:
+            self._put(self._pending, key, entry)
+
+    def commit(self, key):
+        """Делает последний разобранный ответ образцом для сравнения."""
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                self._put(self._entries, key, entry)
+
+    def stats(self):
+        """Возвращает счётчики быстрого пути и полных разборов."""
+        return {
+            'not_modified': FAST_PATH_NOT_MODIFIED.value,
+            'fingerprint': FAST_PATH_FINGERPRINT.value,
+            'full_parse': FULL_PARSES.value,
+        }
@@ -0,0 +1,113 @@
+"""
+Маршрутизация входящих сообщений по таблицам.
+
+telebot проверяет каждое сообщение всеми обработчиками по очереди.
+Здесь обработчик находится одним обращением к словарю: команда — по
+таблице команд, текст кнопки — по заранее нормализованным подписям,
+остальные типы сообщений — по content_type. Текст длиннее самой длинной
+подписи не нормализуется вовсе.
+"""
+from metrics import REGISTRY
+
+ROUTED = REGISTRY.counter(
+    'dispatch_routed_total', 'Сообщения, переданные обработчику.')
+IGNORED = REGISTRY.counter(
+    'dispatch_ignored_total', 'Сообщения без подходящего обработчика.')
+
+
+def normalize(text):
+    """Приводит текст кнопки к виду для поиска в таблице."""
+    return ' '.join(text.split()).casefold()
+
+
+def command_name(text):
+    """Возвращает команду без / и @имя_бота или None."""
+    if not text.startswith('/'):
+        return None
+    # После / может сразу идти пробел или перевод строки
+    parts = text[1:].split(maxsplit=1)
+    command = parts[0] if parts else ''
+    return command.partition('@')[0].lower()
+
+
+class Dispatcher:
+    """Таблицы команд, подписей кнопок и типов сообщений."""
+
+    def __init__(self, run=None):
+        """
+        Создаёт пустые таблицы.
+
+        run(handler, message) запускает обработчик, например в пуле
+        потоков; по умолчанию обработчик вызывается сразу.
+        """
+        self._run = run
+        self._commands = {}
+        self._texts = {}
+        self._content_types = {}
+        self._fallback = None
+        self._max_text = 0
+
+    def command(self, *names):
+        """Регистрирует обработчик команд."""
+        def register(handler):
+            for name in names:
+                self._commands[name.lower()] = handler
+            return handler
+        return register
+
+    def text(self, *labels):
+        """Регистрирует обработчик текста кнопок."""
+        def register(handler):
+            for label in labels:
+                key = normalize(label)
+                self._texts[key] = handler
+                # Запас на лишние пробелы вокруг подписи
+                self._max_text = max(self._max_text, 2 * len(key) + 8)
+            return handler
+        return register
+
+    def content_type(self, *content_types):
+        """Регистрирует обработчик сообщений других типов."""
+        def register(handler):
+            for content_type in content_types:
+                self._content_types[content_type] = handler
+            return handler
+        return register
+
+    def fallback(self, handler):
+        """Регистрирует обработчик прочего текста."""
+        self._fallback = handler
+        return handler
+
+    def content_types(self):
+        """Возвращает типы сообщений, которые нужно получать от бота."""
+        return ['text', *self._content_types]
+
+    def route(self, message):
+        """Возвращает обработчик сообщения или None."""
+        if message.content_type != 'text':
+            return self._content_types.get(message.content_type)
+        text = message.text or ''
+        command = command_name(text)
+        if command is not None:
+            return self._commands.get(command, self._fallback)
+        if len(text) <= self._max_text:
+            handler = self._texts.get(normalize(text))
+            if handler is not None:
+                return handler
+        return self._fallback
+
+    def dispatch(self, message):
+        """
+        Вызывает обработчик сообщения и возвращает его результат.
+
+        Для асинхронного обработчика результат — корутина.
+        """
+        handler = self.route(message)
+        if handler is None:
+            IGNORED.inc()
+            return None
+        ROUTED.inc()
+        if self._run is not None:
+            return self._run(handler, message)
+        return handler(message)
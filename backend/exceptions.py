@@ -0,0 +1,13 @@
+"""Исключения бота."""
+
+
+class HomeworkBotError(Exception):
+    """Базовый класс ошибок бота."""
+
+
+class APIResponseError(HomeworkBotError):
+    """Ошибка при запросе к API."""
+
+
+class CircuitOpenError(HomeworkBotError):
+    """Внешний сервис временно отключён предохранителем."""
@@ -0,0 +1,49 @@
+"""
+Имитация Telegram для локальной проверки webhook.
+
+Отправляет на сервер бота обновления с сообщением, как это делает
+Telegram. Пример:
+
+    python fake_telegram.py http://127.0.0.1:8080/telegram секрет /status
+"""
+import itertools
+import sys
+import time
+
+import requests
+
+from webhook import SECRET_HEADER
+
+_update_ids = itertools.count(1)
+
+
+def make_update(text, chat_id=1, user_id=1):
+    """Собирает обновление Telegram с текстовым сообщением."""
+    update_id = next(_update_ids)
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': text,
+            'entities': (
+                [{'type': 'bot_command', 'offset': 0,
+                  'length': len(text.split()[0])}]
+                if text.startswith('/') else []
+            ),
+        },
+    }
+
+
+def post_update(url, secret, update):
+    """Отправляет обновление на webhook и возвращает код ответа."""
+    response = requests.post(
+        url, json=update, headers={SECRET_HEADER: secret}, timeout=5)
+    return response.status_code
+
+
+if __name__ == '__main__':
+    url, secret, text = sys.argv[1], sys.argv[2], ' '.join(sys.argv[3:])
+    print(post_update(url, secret, make_update(text or '/status')))
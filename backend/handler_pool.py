@@ -0,0 +1,120 @@
+"""
+Пулы потоков для обработчиков сообщений.
+
+Дешёвые обработчики (клавиатура, отмена регистрации) и дорогие
+(запрос статуса с обращением к API) выполняются в разных пулах, поэтому
+медленные запросы не задерживают быстрые ответы. Очереди пулов
+ограничены: сообщение, не поместившееся в очередь, отбрасывается.
+Для каждого обработчика считаются квантили задержки от получения
+сообщения до конца обработки.
+"""
+import logging
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+
+CHEAP = 'cheap'
+EXPENSIVE = 'expensive'
+
+
+class HandlerPool:
+    """Потоки-исполнители с ограниченной очередью задач."""
+
+    def __init__(self, name, workers, queue_size):
+        """Создаёт пул; потоки запускаются при первой задаче."""
+        self.name = name
+        self.workers = workers
+        self._queue = queue.Queue(queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._depth = REGISTRY.gauge(
+            'handler_queue_depth', 'Сообщения, ожидающие обработчика.',
+            labels={'pool': name})
+        self._shed = REGISTRY.counter(
+            'handler_shed_total',
+            'Сообщения, отброшенные из-за переполненной очереди.',
+            labels={'pool': name})
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f'handlers-{self.name}-{len(self._threads)}',
+                    daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, func, *args):
+        """Ставит задачу в очередь; False — очередь полна."""
+        if len(self._threads) < self.workers:
+            self._start()
+        try:
+            self._queue.put_nowait((func, args))
+        except queue.Full:
+            self._shed.inc()
+            return False
+        self._depth.set(self._queue.qsize())
+        return True
+
+    def _work(self):
+        while True:
+            func, args = self._queue.get()
+            self._depth.set(self._queue.qsize())
+            func(*args)
+
+
+class HandlerExecutor:
+    """Распределяет обработчики по пулам и измеряет их задержку."""
+
+    def __init__(self, cheap_workers=2, expensive_workers=4, queue_size=100):
+        """Создаёт пулы дешёвых и дорогих обработчиков."""
+        self._pools = {
+            CHEAP: HandlerPool(CHEAP, cheap_workers, queue_size),
+            EXPENSIVE: HandlerPool(EXPENSIVE, expensive_workers, queue_size),
+        }
+        self._expensive = set()
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def expensive(self, handler):
+        """Отмечает обработчик как дорогой."""
+        self._expensive.add(handler)
+        return handler
+
+    def _summary(self, handler):
+        name = handler.__name__
+        with self._lock:
+            summary = self._latency.get(name)
+            if summary is None:
+                summary = self._latency[name] = REGISTRY.summary(
+                    'handler_latency_seconds',
+                    'Время от получения сообщения до конца обработки.',
+                    labels={'handler': name})
+            return summary
+
+    def _run(self, handler, message, received):
+        try:
+            handler(message)
+        except Exception as error:
+            logging.error(f'Ошибка в обработчике {handler.__name__}: {error}')
+        finally:
+            self._summary(handler).observe(time.monotonic() - received)
+
+    def submit(self, handler, message):
+        """Передаёт сообщение обработчику в его пуле."""
+        kind = EXPENSIVE if handler in self._expensive else CHEAP
+        if not self._pools[kind].submit(
+                self._run, handler, message, time.monotonic()):
+            logging.warning(
+                f'Обработчики перегружены, сообщение из чата '
+                f'{message.chat.id} отброшено')
+
+    def latency(self):
+        """Возвращает {обработчик: {квантиль: секунды}}."""
+        with self._lock:
+            summaries = dict(self._latency)
+        return {name: summary.snapshot()[0]
+                for name, summary in summaries.items()}
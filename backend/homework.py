@@ -3,16 +3,42 @@
 
 На платформе Яндекс.Практикум.
 """
+import functools
 import os
 import time
 import logging
 import requests
+import secrets
 import threading
 import telebot
 
+from urllib.parse import urlparse
+
 from dotenv import load_dotenv
 from telebot import apihelper
-from telebot import types
+
+from board import StatusBoard
+from cache import ResponseCache
+from conditional import ConditionalCache, fingerprint
+from dispatch import Dispatcher
+from exceptions import APIResponseError, HomeworkBotError
+from handler_pool import HandlerExecutor
+from homeworks import HomeworkDiff, HomeworkIndexes, updated_at
+from http_client import PooledSession, connection_stats
+from ingest import UpdatePoller
+from metrics import REGISTRY
+from metrics_server import MetricsServer
+from outbound import OutboundQueue, is_permanent_failure, retry_after
+from outbox import OutboxDrainer, outbox_key
+from pipeline import Pipeline, PollJob, Stage
+from ratelimit import (
+    BACKGROUND, INTERACTIVE, RateLimiter, SlidingWindowThrottle)
+from render import DEFAULT_LOCALE, LOCALES, status_keyboard, templates
+from resilience import Backoff, CircuitBreaker, is_service_failure
+from scheduler import AdaptivePollScheduler
+from singleflight import SingleFlight
+from state_store import StateStore
+from tenants import TenantPoller, TenantStore
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -20,40 +46,256 @@ load_dotenv()
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Получатели уведомлений: "id[:статус,статус];id", по умолчанию
+# TELEGRAM_CHAT_ID без фильтра
+TELEGRAM_TARGETS = os.getenv('TELEGRAM_TARGETS', '')
 
 # Настройки API
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 MAX_RETRIES = 5
 RETRY_PERIOD = 600  # 10 минут
+STATUS_WINDOW = 3600  # окно запроса статуса по кнопке, 1 час
+
+# Режим работы: threads (по умолчанию) или asyncio
+RUN_MODE = os.getenv('RUN_MODE', 'threads')
+
+# Многопользовательский режим: студенты регистрируют свои токены
+MULTI_TENANT = os.getenv('MULTI_TENANT', '').lower() in ('1', 'true', 'yes')
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+TENANTS_DB = os.path.join(DATA_DIR, 'tenants.sqlite3')
+TENANT_WORKERS = int(os.getenv('TENANT_WORKERS', 8))
+
+# Конвейер опроса: запросы к API на TENANT_WORKERS потоках,
+# остальные стадии на PIPELINE_WORKERS потоках каждая
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 2))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 100))
+
+# Long polling: типы обновлений, таймауты ожидания и очередь пачек
+ALLOWED_UPDATES = ['message']
+UPDATES_MIN_TIMEOUT = int(os.getenv('UPDATES_MIN_TIMEOUT', 10))
+UPDATES_MAX_TIMEOUT = int(os.getenv('UPDATES_MAX_TIMEOUT', 50))
+UPDATES_QUEUE_SIZE = int(os.getenv('UPDATES_QUEUE_SIZE', 100))
+# Смещение getUpdates хранится как курсор с отдельным владельцем
+UPDATES_CURSOR = 'telegram:updates'
+
+# Приём обновлений через webhook вместо long polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+# Без заданного секрета при каждом запуске создаётся новый случайный
+# секрет, и webhook регистрируется заново уже с ним
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', 1000))
+
+# Эндпоинт /metrics для Prometheus; без METRICS_PORT выключен
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT') or 0)
+
+# Курсор опроса и статусы переживают перезапуск контейнера
+STATE_DB = os.path.join(DATA_DIR, 'state.sqlite3')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 0.5))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+# Уведомления одного чата за окно объединяются в одно сообщение
+NOTIFY_COALESCE_WINDOW = float(os.getenv('NOTIFY_COALESCE_WINDOW', 5))
+NOTIFY_MAX_LATENCY = float(os.getenv('NOTIFY_MAX_LATENCY', 30))
+
+# Настройки пула HTTP-соединений к API Практикума
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+
+# Одна сессия на процесс: соединения переиспользуются между запросами
+practicum_session = PooledSession(
+    pool_size=HTTP_POOL_SIZE,
+    connect_timeout=HTTP_CONNECT_TIMEOUT,
+    read_timeout=HTTP_READ_TIMEOUT,
+    retries=MAX_RETRIES,
+    backoff_factor=HTTP_BACKOFF_FACTOR,
+)
+
+PRACTICUM_SECONDS = REGISTRY.histogram(
+    'practicum_request_seconds', 'Длительность запроса к API Практикума.')
+POLL_CYCLE_SECONDS = REGISTRY.histogram(
+    'poll_cycle_seconds', 'Длительность цикла опроса API.')
+LAST_POLL = REGISTRY.gauge(
+    'poll_last_success_timestamp_seconds',
+    'Время последнего успешного запроса к API, секунды эпохи.')
+
+
+def count_practicum_response(code):
+    """Учитывает ответ API по HTTP-коду; error — ответа нет."""
+    REGISTRY.counter(
+        'practicum_responses_total', 'Ответы API Практикума по HTTP-коду.',
+        labels={'code': str(code)}).inc()
+
+
+# Ограничение частоты запросов к API: общее и для каждого токена
+PRACTICUM_RATE = float(os.getenv('PRACTICUM_RATE', 5))
+PRACTICUM_BURST = float(os.getenv('PRACTICUM_BURST', 10))
+PRACTICUM_TOKEN_RATE = float(os.getenv('PRACTICUM_TOKEN_RATE', 0.2))
+PRACTICUM_TOKEN_BURST = float(os.getenv('PRACTICUM_TOKEN_BURST', 3))
+
+practicum_limiter = RateLimiter(
+    PRACTICUM_RATE, PRACTICUM_BURST,
+    PRACTICUM_TOKEN_RATE, PRACTICUM_TOKEN_BURST,
+)
+
+# Повторы после ошибок опроса и предохранители внешних API
+POLL_ERROR_BACKOFF_BASE = float(os.getenv('POLL_ERROR_BACKOFF_BASE', 5))
+POLL_ERROR_BACKOFF_CAP = float(
+    os.getenv('POLL_ERROR_BACKOFF_CAP', RETRY_PERIOD))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv('BREAKER_RECOVERY_TIMEOUT', 60))
+
+practicum_breaker = CircuitBreaker(
+    'practicum',
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=BREAKER_RECOVERY_TIMEOUT,
+)
+telegram_breaker = CircuitBreaker(
+    'telegram',
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=BREAKER_RECOVERY_TIMEOUT,
+)
+
+# Очередь исходящих сообщений с ограничениями Telegram
+TELEGRAM_WORKERS = int(os.getenv('TELEGRAM_WORKERS', 4))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_GROUP_RATE = float(os.getenv('TELEGRAM_GROUP_RATE', 20 / 60))
+OUTBOUND_QUEUE_SIZE = int(os.getenv('OUTBOUND_QUEUE_SIZE', 10000))
+
+# Запросы статуса из одного чата за окно: обновления из API и ответы;
+# между обновлениями отдаётся последний известный статус
+STATUS_REFRESH_LIMIT = int(os.getenv('STATUS_REFRESH_LIMIT', 1))
+STATUS_REPLY_LIMIT = int(os.getenv('STATUS_REPLY_LIMIT', 5))
+STATUS_THROTTLE_WINDOW = float(os.getenv('STATUS_THROTTLE_WINDOW', 30))
+
+status_refreshes = SlidingWindowThrottle(
+    'status_refresh', STATUS_REFRESH_LIMIT, STATUS_THROTTLE_WINDOW)
+status_replies = SlidingWindowThrottle(
+    'status_reply', STATUS_REPLY_LIMIT, STATUS_THROTTLE_WINDOW)
+
+# Доска статусов: одно закреплённое сообщение, которое правится на месте
+STATUS_BOARD = os.getenv('STATUS_BOARD', '').lower() in ('1', 'true', 'yes')
+STATUS_BOARD_SIZE = int(os.getenv('STATUS_BOARD_SIZE', 10))
+
+# Кэш ответов API, общий для фонового опроса и обработчиков /status
+CACHE_TTL = float(os.getenv('CACHE_TTL', 60))
+CACHE_STALE_TTL = float(os.getenv('CACHE_STALE_TTL', 600))
+CACHE_WINDOW = int(os.getenv('CACHE_WINDOW', 60))
+# Сколько токенов помнят кэши ответов, хэшей и индексов работ; в
+# многопользовательском режиме ёмкость растёт вместе с числом студентов
+CACHE_MAX_TOKENS = int(os.getenv('CACHE_MAX_TOKENS', 1024))
+
+response_cache = ResponseCache(
+    ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL, window=CACHE_WINDOW,
+    max_tokens=CACHE_MAX_TOKENS)
+
+# Адаптивный интервал опроса API
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 60))
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 3600))
+POLL_BACKOFF_FACTOR = float(os.getenv('POLL_BACKOFF_FACTOR', 2))
+POLL_IDLE_CYCLES = int(os.getenv('POLL_IDLE_CYCLES', 3))
+
+poll_scheduler = AdaptivePollScheduler(
+    min_interval=POLL_MIN_INTERVAL,
+    base_interval=RETRY_PERIOD,
+    max_interval=POLL_MAX_INTERVAL,
+    backoff_factor=POLL_BACKOFF_FACTOR,
+    idle_cycles=POLL_IDLE_CYCLES,
+)
+
+# Одинаковые одновременные запросы к API выполняются один раз
+practicum_flight = SingleFlight()
+
+# Индексы работ по токенам, общие для опроса и /status
+homework_indexes = HomeworkIndexes(max_indexes=CACHE_MAX_TOKENS)
+
+# ETag и хэши последних ответов для пропуска неизменившихся данных;
+# ключ включает from_date, поэтому на токен приходится несколько записей
+conditional_cache = ConditionalCache(max_entries=4 * CACHE_MAX_TOKENS)
+
+state_store = StateStore(STATE_DB, flush_interval=STATE_FLUSH_INTERVAL)
+
+# Хранилище и общий планировщик опроса для многопользовательского режима
+tenant_store = TenantStore(TENANTS_DB) if MULTI_TENANT else None
+
+
+def size_token_caches(tenants):
+    """Расширяет кэши по токенам, чтобы в них помещались все студенты."""
+    # Запас на владельца и студентов, зарегистрированных до пересчёта
+    size = max(CACHE_MAX_TOKENS, 2 * tenants)
+    response_cache.max_tokens = size
+    homework_indexes.max_indexes = size
+    conditional_cache.max_entries = 4 * size
+
+
+if MULTI_TENANT:
+    size_token_caches(tenant_store.count())
+
+# Пулы обработчиков: быстрые ответы и запросы к API отдельно
+HANDLER_WORKERS = int(os.getenv('HANDLER_WORKERS', 2))
+HANDLER_EXPENSIVE_WORKERS = int(os.getenv('HANDLER_EXPENSIVE_WORKERS', 4))
+HANDLER_QUEUE_SIZE = int(os.getenv('HANDLER_QUEUE_SIZE', 100))
+
+handler_executor = HandlerExecutor(
+    cheap_workers=HANDLER_WORKERS,
+    expensive_workers=HANDLER_EXPENSIVE_WORKERS,
+    queue_size=HANDLER_QUEUE_SIZE,
+)
 
-# Создаём бота один раз!
-bot = telebot.TeleBot(TELEGRAM_TOKEN)
+# Создаём бота один раз! Обработчики запускает handler_executor
+bot = telebot.TeleBot(TELEGRAM_TOKEN, threaded=False)
+# Обработчики сообщений ищутся по таблицам, а не перебором
+dispatcher = Dispatcher(run=handler_executor.submit)
+
+# Тексты и шаблоны сообщений собраны заранее в render
+TEMPLATES = templates()
+STATUS_BUTTON = TEMPLATES.text('button')
 
 # Возможные статусы домашней работы
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+HOMEWORK_VERDICTS = LOCALES[DEFAULT_LOCALE]['verdicts']
+
 
+def parse_targets(value):
+    """
+    Разбирает список получателей уведомлений.
 
-class HomeworkBotError(Exception):
-    """Базовый класс ошибок бота."""
+    Возвращает [(chat_id, статусы или None)]; None пропускает все статусы.
+    """
+    targets = []
+    for item in value.split(';'):
+        chat_id, _, statuses = item.strip().partition(':')
+        if not chat_id:
+            continue
+        allowed = frozenset(
+            status.strip() for status in statuses.split(',')
+            if status.strip())
+        targets.append((chat_id, allowed or None))
+    return targets
 
 
-class APIResponseError(HomeworkBotError):
-    """Ошибка при запросе к API."""
+NOTIFY_TARGETS = (
+    parse_targets(TELEGRAM_TARGETS) or [(TELEGRAM_CHAT_ID, None)])
+# Без многопользовательского режима статус видят только чаты владельца
+STATUS_CHATS = frozenset(
+    [str(TELEGRAM_CHAT_ID)] + [chat_id for chat_id, _ in NOTIFY_TARGETS])
 
 
 def check_tokens():
     """Проверяет наличие всех необходимых токенов."""
-    missing_tokens = [
-        token for token, value in {
+    required_tokens = {'TELEGRAM_TOKEN': TELEGRAM_TOKEN}
+    if not MULTI_TENANT:
+        # В многопользовательском режиме токены приходят от студентов
+        required_tokens.update({
             'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
-            'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
             'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID
-        }.items() if not value
+        })
+    missing_tokens = [
+        token for token, value in required_tokens.items() if not value
     ]
     if missing_tokens:
         logging.critical(f'Отсутствуют токены: {", ".join(missing_tokens)}')
@@ -61,28 +303,180 @@ def check_tokens():
     return True
 
 
-def send_message(message):
-    """Отправляет сообщение в Telegram."""
+def check_run_mode():
+    """Проверяет, что выбранные возможности работают в режиме RUN_MODE."""
+    if RUN_MODE == 'asyncio' and STATUS_BOARD:
+        # Доска правится синхронным ботом из потоков очереди отправки
+        logging.critical('STATUS_BOARD не поддерживается с RUN_MODE=asyncio')
+        return False
+    if RUN_MODE == 'asyncio' and MULTI_TENANT:
+        logging.warning(
+            'Многопользовательский режим работает только на потоках, '
+            'RUN_MODE=asyncio не действует')
+    return True
+
+
+def is_telegram_failure(error):
+    """Проверяет, вызвана ли ошибка отправки сбоем самого Telegram."""
+    if isinstance(error, apihelper.ApiTelegramException):
+        return is_service_failure(error.error_code)
+    if isinstance(error, apihelper.ApiHTTPException):
+        return is_service_failure(error.result.status_code)
+    return True
+
+
+def call_telegram(func, *args, **kwargs):
+    """
+    Вызывает метод Telegram API через предохранитель.
+
+    Ошибки пробрасываются: ответ 429 очередь повторит после паузы.
+    """
+    telegram_breaker.before_call()
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logging.info(f'Бот отправил сообщение: {message}')
-        return True
+        result = func(*args, **kwargs)
     except (apihelper.ApiException, requests.RequestException) as error:
-        logging.error(f'Ошибка при отправке сообщения: {error}')
-    return False
+        # На 429 отвечает очередь, сбоем Telegram он не считается
+        if retry_after(error) is None and is_telegram_failure(error):
+            telegram_breaker.on_failure()
+        else:
+            telegram_breaker.on_success()
+        raise
+    telegram_breaker.on_success()
+    return result
 
 
-def get_api_answer(timestamp):
-    """Запрашивает статус домашней работы через API."""
+def deliver_message(chat_id, text, **kwargs):
+    """Отправляет сообщение в Telegram из очереди."""
+    call_telegram(bot.send_message, chat_id, text, **kwargs)
+    logging.info(f'Бот отправил сообщение: {text}')
+
+
+outbound_queue = OutboundQueue(
+    deliver_message,
+    workers=TELEGRAM_WORKERS,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    group_rate=TELEGRAM_GROUP_RATE,
+    max_size=OUTBOUND_QUEUE_SIZE,
+)
+
+
+status_board = StatusBoard(state_store, bot, call=call_telegram)
+
+
+def reply(chat_id, text, **kwargs):
+    """Ставит ответ пользователю в очередь, не дожидаясь отправки."""
+    outbound_queue.enqueue(chat_id, text, **kwargs)
+
+
+def _request_api_answer(timestamp, token, priority, poll):
+    """
+    Выполняет HTTP-запрос к API и сохраняет ответ в кэш.
+
+    Возвращает ответ и признак того, изменился ли он с прошлого
+    запроса с теми же токеном и from_date. Быстрый путь работает
+    только для опроса: остальные запросы не подтверждаются через
+    commit_poll() и всегда считаются изменившимися.
+    """
+    key = (token, timestamp)
     params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    if poll:
+        headers.update(conditional_cache.request_headers(key))
+    practicum_breaker.before_call()
+    practicum_limiter.acquire(token, priority)
+    started = time.monotonic()
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
-        if response.status_code != 200:
-            raise APIResponseError(
-                f'Ошибка API: {response.status_code}, {response.text}')
-        return response.json()
+        response = practicum_session.get(
+            ENDPOINT, headers=headers, params=params)
     except requests.RequestException as error:
+        count_practicum_response('error')
+        practicum_breaker.on_failure()
         raise APIResponseError(f'Ошибка запроса: {error}')
+    finally:
+        PRACTICUM_SECONDS.observe(time.monotonic() - started)
+    count_practicum_response(response.status_code)
+    # Ошибки клиента (например, чужой неверный токен) не размыкают цепь
+    if is_service_failure(response.status_code):
+        practicum_breaker.on_failure()
+    else:
+        practicum_breaker.on_success()
+    if poll and response.status_code == 304:
+        answer = conditional_cache.not_modified(key)
+        if answer is not None:
+            response_cache.put(token, timestamp, answer)
+            return answer, False
+    if response.status_code != 200:
+        raise APIResponseError(
+            f'Ошибка API: {response.status_code}, {response.text}')
+    if not poll:
+        answer = response.json()
+        response_cache.put(token, timestamp, answer)
+        return answer, True
+
+    # Тот же ответ, что и в прошлый раз, не разбираем заново
+    digest = fingerprint(response.content)
+    answer = conditional_cache.match(key, digest)
+    changed = answer is None
+    if changed:
+        answer = response.json()
+        conditional_cache.remember(key, response.headers, digest, answer)
+    response_cache.put(token, timestamp, answer)
+    return answer, changed
+
+
+def fetch_api_answer(timestamp, token=None, priority=BACKGROUND, poll=False):
+    """
+    Запрашивает ответ API и признак его изменения с прошлого раза.
+
+    poll=True только у опроса: его ответ ждёт подтверждения commit_poll().
+    """
+    token = token or PRACTICUM_TOKEN
+    return practicum_flight.do(
+        (token, timestamp, poll), _request_api_answer,
+        timestamp, token, priority, poll)
+
+
+def get_api_answer(timestamp, token=None, priority=BACKGROUND):
+    """Запрашивает статус домашней работы через API."""
+    answer, _ = fetch_api_answer(timestamp, token, priority)
+    return answer
+
+
+def _refresh_cached_answer(timestamp, token):
+    """Обновляет устаревшую запись кэша в фоне."""
+    try:
+        get_api_answer(timestamp, token)
+    except HomeworkBotError as error:
+        logging.error(f'Не удалось обновить кэш: {error}')
+    finally:
+        response_cache.end_refresh(token, timestamp)
+
+
+def get_cached_api_answer(timestamp, token=None):
+    """Возвращает ответ API из кэша, при промахе запрашивает его."""
+    token = token or PRACTICUM_TOKEN
+    cached = response_cache.get(token, timestamp)
+    if cached is None:
+        return get_api_answer(timestamp, token, INTERACTIVE)
+    answer, stale = cached
+    if stale and response_cache.begin_refresh(token, timestamp):
+        threading.Thread(
+            target=_refresh_cached_answer, args=(timestamp, token),
+            daemon=True
+        ).start()
+    return answer
+
+
+def status_window_start():
+    """
+    Возвращает from_date для запроса статуса по кнопке.
+
+    Значение выровнено по окну кэша, чтобы одновременные нажатия
+    давали одинаковые запросы и объединялись.
+    """
+    timestamp = int(time.time()) - STATUS_WINDOW
+    return timestamp - timestamp % CACHE_WINDOW
 
 
 def check_response(response):
@@ -112,133 +506,437 @@ def parse_status(homework):
     if status not in HOMEWORK_VERDICTS:
         raise ValueError(f'Неизвестный статус: {status}')
 
-    return (
-        f'Статус работы "{homework_name}": '
-        f'{HOMEWORK_VERDICTS[status]}'
-    )
-
-
-@bot.message_handler(commands=['status'])
+    return TEMPLATES.render('status', status, homework_name=homework_name)
+
+
+def request_status(message):
+    """Отправляет статус в чат, из которого пришёл запрос."""
+    chat_id = message.chat.id
+    if not status_replies.allow(chat_id):
+        # Слишком частые запросы остаются без ответа
+        return
+    if not MULTI_TENANT:
+        if str(chat_id) not in STATUS_CHATS:
+            reply(chat_id, TEMPLATES.text('owner_only'))
+            return
+        send_homework_status(chat_id)
+        return
+    tenant = tenant_store.get(chat_id)
+    if tenant is None:
+        reply(message.chat.id, TEMPLATES.text('register_first'))
+        return
+    send_homework_status(tenant.chat_id, tenant.token)
+
+
+@dispatcher.command('status')
+@handler_executor.expensive
 def handle_status(message):
     """Обработчик команды /status."""
-    send_homework_status()
+    request_status(message)
 
 
-@bot.message_handler(
-    func=lambda message: message.text.lower() == 'проверить статус домашнего задания'
-)
+@dispatcher.text(STATUS_BUTTON)
+@handler_executor.expensive
 def handle_button_status(message):
     """Обработчик кнопки проверки статуса."""
-    send_homework_status()
+    request_status(message)
+
+
+@handler_executor.expensive
+def handle_register(message):
+    """Регистрирует токен Практикума студента."""
+    chat_id = message.chat.id
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2:
+        reply(chat_id, TEMPLATES.text('register_usage'))
+        return
+    token = parts[1].strip()
+    # Не оставляем токен в истории чата
+    try:
+        bot.delete_message(chat_id, message.message_id)
+    except apihelper.ApiException as error:
+        logging.error(f'Не удалось удалить сообщение с токеном: {error}')
+    timestamp = int(time.time())
+    try:
+        get_api_answer(timestamp, token, INTERACTIVE)
+    except HomeworkBotError as error:
+        reply(chat_id, TEMPLATES.text('token_rejected', error=error))
+        return
+    tenant_store.register(chat_id, token, timestamp)
+    size_token_caches(tenant_store.count())
+    tenant_poller.add(chat_id)
+    reply(chat_id, TEMPLATES.text('registered'))
+
+
+def handle_unregister(message):
+    """Удаляет токен студента и прекращает опрос."""
+    if tenant_store.unregister(message.chat.id):
+        text = TEMPLATES.text('unregistered')
+    else:
+        text = TEMPLATES.text('not_registered')
+    reply(message.chat.id, text)
+
 
+if MULTI_TENANT:
+    dispatcher.command('register')(handle_register)
+    dispatcher.command('unregister')(handle_unregister)
 
-@bot.message_handler(func=lambda message: True)
+
+@dispatcher.fallback
 def send_status_keyboard(message):
     """Отправляет клавиатуру с кнопкой проверки статуса."""
-    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True)
-    button = types.KeyboardButton('Проверить статус домашнего задания')
-    keyboard.add(button)
-    bot.send_message(
+    reply(
         message.chat.id,
-        "Нажмите кнопку, чтобы проверить статус домашнего задания.",
-        reply_markup=keyboard
+        TEMPLATES.text('keyboard_prompt'),
+        reply_markup=status_keyboard()
     )
 
 
-def send_homework_status():
-    """Отправляет статус домашней работы пользователю."""
-    try:
-        # Запрашиваем данные за последний час (3600 секунд)
-        timestamp = int(time.time()) - 3600
-        response = get_api_answer(timestamp)
-        homeworks = check_response(response)
-
-        if homeworks:
-            # Сортируем работы по дате обновления (новые сначала)
-            homeworks_sorted = sorted(
-                homeworks,
-                key=lambda x: x.get('date_updated', 0),
-                reverse=True
-            )
-            latest_homework = homeworks_sorted[0]
-
-            # Формируем расширенное сообщение
-            status = latest_homework['status']
-            homework_name = latest_homework['homework_name']
-            message = (
-                f"Работа: {homework_name}\n"
-                f"Статус: {HOMEWORK_VERDICTS[status]}\n"
-                f"Последнее обновление: '{time.ctime(latest_homework.get('date_updated', time.time()))}"
-            )
-        else:
-            message = "Данные о домашней работе ещё не получены. Попробуйте позже."
+bot.register_message_handler(
+    dispatcher.dispatch, content_types=dispatcher.content_types())
+
+
+def build_status_message(latest_homework):
+    """Формирует ответ на запрос статуса по самой свежей работе."""
+    if latest_homework is None:
+        return TEMPLATES.text('no_data')
+
+    # Формируем расширенное сообщение
+    return TEMPLATES.render(
+        'latest',
+        latest_homework['status'],
+        homework_name=latest_homework['homework_name'],
+        updated=time.ctime(updated_at(latest_homework) or time.time()),
+    )
+
+
+def build_change_message(change):
+    """Формирует уведомление об изменении статуса работы."""
+    return TEMPLATES.render(
+        'changed', change.new_status, homework_name=change.homework_name)
+
+
+def build_board_message(homeworks):
+    """Формирует текст доски статусов: свежие работы первыми."""
+    if not homeworks:
+        return build_status_message(None)
+    lines = [TEMPLATES.text('board_header')]
+    for homework in reversed(homeworks[-STATUS_BOARD_SIZE:]):
+        lines.append(TEMPLATES.render(
+            'board_line', homework['status'],
+            homework_name=homework['homework_name']))
+    return "\n".join(lines)
+
+
+def refresh_board(chat_id, token=None, force=False):
+    """Ставит в очередь обновление доски статусов чата."""
+    index = homework_indexes.for_token(token or PRACTICUM_TOKEN)
+    text = build_board_message(index.changed_since(0))
+    outbound_queue.submit(chat_id, status_board.show, chat_id, text, force)
+
+
+def build_digest_message(texts):
+    """Объединяет несколько уведомлений одного чата в одно сообщение."""
+    if len(texts) == 1:
+        return texts[0]
+    header = TEMPLATES.text('digest_header', count=len(texts))
+    return "\n\n".join([header, *texts])
+
+
+outbox_drainer = OutboxDrainer(
+    state_store,
+    outbound_queue.enqueue,
+    batch_size=OUTBOX_BATCH_SIZE,
+    backoff_base=POLL_ERROR_BACKOFF_BASE,
+    backoff_cap=POLL_ERROR_BACKOFF_CAP,
+    window=NOTIFY_COALESCE_WINDOW,
+    max_latency=NOTIFY_MAX_LATENCY,
+    merge=build_digest_message,
+    permanent=is_permanent_failure,
+)
+
 
+def commit_change(owner, homework_diff, change):
+    """Запоминает доставленное изменение в снимке и в хранилище."""
+    homework_diff.commit(change)
+    state_store.set_status(
+        owner, change.key, change.new_status, change.date_updated)
+
+
+def queue_changes(owner, homework_diff, changes, chat_id=None, token=None,
+                  texts=None):
+    """
+    Записывает уведомления об изменениях в outbox.
+
+    Уведомление и новый статус работы сохраняются вместе, доставку
+    выполняет outbox_drainer. Без chat_id уведомление получают все
+    NOTIFY_TARGETS, чей фильтр пропускает новый статус. texts — уже
+    подготовленные тексты уведомлений по одному на изменение. В режиме
+    доски статусов вместо уведомлений обновляются доски получателей.
+    """
+    targets = [(chat_id, None)] if chat_id else NOTIFY_TARGETS
+    if STATUS_BOARD:
+        for change in changes:
+            commit_change(owner, homework_diff, change)
+        if changes:
+            for target, _ in targets:
+                refresh_board(target, token)
+        return
+    if texts is None:
+        texts = [build_change_message(change) for change in changes]
+    # Текст один на всех получателей
+    for change, text in zip(changes, texts):
+        for target, statuses in targets:
+            if statuses is None or change.new_status in statuses:
+                state_store.add_outbox(
+                    outbox_key(target, change), target, text)
+        commit_change(owner, homework_diff, change)
+    if changes:
+        outbox_drainer.wake()
+
+
+def send_homework_status(chat_id=None, token=None):
+    """
+    Отправляет статус домашней работы пользователю.
+
+    Чаще STATUS_REFRESH_LIMIT раз за окно API не запрашивается,
+    а ответ строится по уже известным работам.
+    """
+    chat_id = chat_id or TELEGRAM_CHAT_ID
+    refresh = status_refreshes.allow(chat_id)
+    try:
+        index = homework_indexes.for_token(token or PRACTICUM_TOKEN)
+        if refresh:
+            # Студенты опрашиваются с постоянным интервалом tenant_poller,
+            # планировщик владельца в этом режиме не работает
+            if not MULTI_TENANT:
+                poll_scheduler.reset()
+            # Запрашиваем данные за последний час
+            timestamp = status_window_start()
+            response = get_cached_api_answer(timestamp, token)
+            index.update(check_response(response))
+        if STATUS_BOARD:
+            refresh_board(chat_id, token, force=refresh)
+            return
+        message = build_status_message(index.latest())
     except HomeworkBotError as error:
-        message = f"Ошибка при получении статуса: {error}"
+        message = TEMPLATES.text('status_error', error=error)
     except Exception as error:
-        message = f"Неожиданная ошибка: {error}"
+        message = TEMPLATES.text('unexpected_error', error=error)
+
+    reply(chat_id, message)
+
+
+def polled_homeworks(job):
+    """
+    Возвращает работы из ответа опроса, в том числе неизменившегося.
+
+    Неизменившийся ответ уже проверялся, когда был разобран впервые,
+    и для планировщика опроса значит то же, что и в прошлый раз.
+    """
+    if job.homeworks is not None:
+        return job.homeworks
+    return job.response['homeworks']
+
+
+def commit_poll(job):
+    """Подтверждает, что ответ API по курсору задания обработан."""
+    conditional_cache.commit((job.token or PRACTICUM_TOKEN, job.cursor))
+
+
+def fetch_stage(job):
+    """Запрашивает API; неизменившийся ответ дальше не передаётся."""
+    job.response, changed = fetch_api_answer(
+        job.cursor, job.token, poll=True)
+    LAST_POLL.set(time.time())
+    return job if changed else None
+
+
+def validate_stage(job):
+    """Проверяет ответ API и обновляет индекс работ."""
+    job.homeworks = check_response(job.response)
+    homework_indexes.for_token(job.token or PRACTICUM_TOKEN).update(
+        job.homeworks)
+    return job
+
+
+def diff_stage(job):
+    """Находит изменения статусов; без изменений задание завершается."""
+    if job.diff is None:
+        job.diff = HomeworkDiff(state_store.get_statuses(job.owner))
+    job.changes = job.diff.diff(job.homeworks)
+    if not job.changes:
+        commit_poll(job)
+        return None
+    return job
+
+
+def render_stage(job):
+    """Готовит тексты уведомлений; доска статусов собирается при доставке."""
+    if not STATUS_BOARD:
+        job.texts = [build_change_message(change) for change in job.changes]
+    return job
+
+
+def deliver_stage(job):
+    """Записывает уведомления в outbox и сдвигает курсор владельца."""
+    queue_changes(job.owner, job.diff, job.changes,
+                  job.chat_id, job.token, job.texts)
+    commit_poll(job)
+    job.cursor = job.response.get('current_date', int(time.time()))
+    last_status = job.changes[-1].new_status
+    if job.chat_id is None:
+        state_store.set_cursor(job.owner, job.cursor, last_status)
+    else:
+        tenant_store.update_state(job.chat_id, job.cursor, last_status)
+    return job
+
+
+poll_pipeline = Pipeline(
+    'poll',
+    [
+        Stage('fetch', fetch_stage, TENANT_WORKERS),
+        Stage('validate', validate_stage, PIPELINE_WORKERS),
+        Stage('diff', diff_stage, PIPELINE_WORKERS),
+        Stage('render', render_stage, PIPELINE_WORKERS),
+        Stage('deliver', deliver_stage, PIPELINE_WORKERS),
+    ],
+    queue_size=PIPELINE_QUEUE_SIZE,
+)
+
+
+def log_tenant_poll(chat_id, started, future):
+    """Учитывает длительность опроса студента и пишет в лог его ошибку."""
+    POLL_CYCLE_SECONDS.observe(time.monotonic() - started)
+    error = future.exception()
+    if error is not None:
+        logging.error(f'Ошибка опроса для чата {chat_id}: {error}')
+
+
+def poll_tenant(tenant):
+    """
+    Передаёт опрос студента конвейеру, не дожидаясь его окончания.
+
+    Возвращает Future задания: от его завершения tenant_poller
+    отсчитывает следующий опрос.
+    """
+    started = time.monotonic()
+    job = PollJob(str(tenant.chat_id), tenant.cursor,
+                  token=tenant.token, chat_id=tenant.chat_id)
+    future = poll_pipeline.submit(job)
+    future.add_done_callback(
+        functools.partial(log_tenant_poll, tenant.chat_id, started))
+    return future
+
+
+tenant_poller = TenantPoller(
+    tenant_store, poll_tenant, interval=RETRY_PERIOD, workers=TENANT_WORKERS
+) if MULTI_TENANT else None
+
+
+def load_updates_offset():
+    """Возвращает сохранённое смещение getUpdates или None."""
+    cursor = state_store.get_cursor(UPDATES_CURSOR)
+    return cursor[0] if cursor else None
+
 
-    send_message(message)
+def save_updates_offset(offset):
+    """Сохраняет смещение getUpdates после обработки пачки."""
+    state_store.set_cursor(UPDATES_CURSOR, offset, None)
+
+
+update_poller = UpdatePoller(
+    bot,
+    load_updates_offset,
+    save_updates_offset,
+    allowed_updates=ALLOWED_UPDATES,
+    min_timeout=UPDATES_MIN_TIMEOUT,
+    max_timeout=UPDATES_MAX_TIMEOUT,
+    queue_size=UPDATES_QUEUE_SIZE,
+)
+
+
+def webhook_server(process_updates):
+    """Создаёт сервер webhook по настройкам окружения."""
+    # aiohttp нужен только webhook и асинхронному режиму
+    from webhook import WebhookServer
+    return WebhookServer(
+        process_updates,
+        WEBHOOK_SECRET,
+        path=urlparse(WEBHOOK_URL).path or '/',
+        queue_size=WEBHOOK_QUEUE_SIZE,
+    )
 
 
 def main():
     """Основной цикл работы бота."""
-    if not check_tokens():
+    if not check_tokens() or not check_run_mode():
         exit()
 
-    timestamp = int(time.time())
-    last_status = None
-
-    def start_polling():
-        """Запускает long polling для Telegram-бота."""
-        while True:
-            try:
-                bot.polling(none_stop=True, interval=5, timeout=30)
-            except Exception as error:
-                logging.error(f'Ошибка бота: {error}')
-                time.sleep(10)
-
-    thread = threading.Thread(target=start_polling, daemon=True)
-    thread.start()
+    if METRICS_PORT:
+        MetricsServer().start_in_thread(METRICS_HOST, METRICS_PORT)
+
+    # Многопользовательский режим работает на пуле потоков
+    if RUN_MODE == 'asyncio' and not MULTI_TENANT:
+        # aiohttp нужен только асинхронному режиму
+        import async_bot
+        async_bot.run()
+        return
+
+    # После перезапуска продолжаем с сохранённого курсора
+    saved_cursor = state_store.get_cursor(TELEGRAM_CHAT_ID)
+    timestamp = saved_cursor[0] if saved_cursor else int(time.time())
+    homework_diff = HomeworkDiff(state_store.get_statuses(TELEGRAM_CHAT_ID))
+    error_backoff = Backoff(POLL_ERROR_BACKOFF_BASE, POLL_ERROR_BACKOFF_CAP)
+
+    if WEBHOOK_URL:
+        server = webhook_server(bot.process_new_updates)
+        server.start_in_thread(WEBHOOK_HOST, WEBHOOK_PORT)
+        bot.set_webhook(
+            url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET,
+            allowed_updates=ALLOWED_UPDATES)
+    else:
+        # getUpdates не работает, пока зарегистрирован webhook
+        bot.remove_webhook()
+        update_poller.start()
+    # Досылает уведомления, оставшиеся в outbox до перезапуска
+    outbox_drainer.start()
+
+    if MULTI_TENANT:
+        tenant_poller.run()
+        return
 
     while True:
         try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            current_timestamp = response.get('current_date', int(time.time()))
-
-            if homeworks:
-                # Сортируем по дате обновления
-                homeworks_sorted = sorted(
-                    homeworks,
-                    key=lambda x: x.get('date_updated', 0),
-                    reverse=True
-                )
-                current_status = homeworks_sorted[0]['status']
-
-                if current_status != last_status:
-                    message = (
-                        f"Статус изменён!\n"
-                        f"Работа: {homeworks_sorted[0]['homework_name']}\n"
-                        f"Новый статус: {HOMEWORK_VERDICTS[current_status]}"
-                    )
-                    if send_message(message):
-                        last_status = current_status
-                        timestamp = current_timestamp
+            started = time.monotonic()
+            job = PollJob(TELEGRAM_CHAT_ID, timestamp, diff=homework_diff)
+            # Снимок статусов один, поэтому опросы идут по одному
+            try:
+                poll_pipeline.submit(job).result()
+            finally:
+                POLL_CYCLE_SECONDS.observe(time.monotonic() - started)
+            poll_scheduler.observe(polled_homeworks(job))
+            if job.changes:
+                timestamp = job.cursor
             else:
                 logging.info('Новых статусов нет')
+            logging.debug(f'Соединения с API: {connection_stats()}')
+            logging.debug(f'Кэш ответов API: {response_cache.stats()}')
+            logging.debug(f'Быстрый путь: {conditional_cache.stats()}')
+            logging.debug(f'Доставка по чатам: {outbox_drainer.stats()}')
+            logging.debug(f'Стадии опроса: {poll_pipeline.timings()}')
+            logging.debug(
+                f'Задержка обработчиков: {handler_executor.latency()}')
 
         except Exception as error:
             logging.error(f'Ошибка: {error}')
-            time.sleep(RETRY_PERIOD)
-        finally:
-            time.sleep(RETRY_PERIOD)
+            poll_scheduler.sleep(error_backoff.next_delay())
+        else:
+            error_backoff.reset()
+            poll_scheduler.sleep()
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[logging.StreamHandler()]
-    )
-    main()
+    # Под именем __main__ модуль существовал бы вторым экземпляром рядом
+    # с homework, который импортирует async_bot
+    exit('Запускайте бота командой python run.py')
@@ -0,0 +1,173 @@
+"""Отслеживание изменений статусов отдельных домашних работ."""
+import bisect
+import threading
+
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+StatusChange = namedtuple(
+    'StatusChange', 'key homework_name old_status new_status date_updated')
+
+
+def homework_key(homework):
+    """Возвращает устойчивый ключ работы: id или название."""
+    return str(homework.get('id', homework['homework_name']))
+
+
+def updated_at(homework):
+    """
+    Возвращает время обновления работы в секундах эпохи.
+
+    API отдаёт date_updated строкой ISO 8601, но число тоже принимается.
+    """
+    date_updated = homework.get('date_updated')
+    if date_updated is None:
+        return 0.0
+    if isinstance(date_updated, (int, float)):
+        return float(date_updated)
+    try:
+        return datetime.fromisoformat(
+            date_updated.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _version(homework):
+    """Возвращает компактный снимок работы: статус и время обновления."""
+    date_updated = homework.get('date_updated')
+    return (
+        homework['status'],
+        None if date_updated is None else str(date_updated),
+    )
+
+
+class HomeworkDiff:
+    """
+    Снимок статусов всех отслеживаемых работ.
+
+    diff() за один проход по ответу API возвращает по событию на каждый
+    переход. Работа с тем же статусом, но новым date_updated тоже
+    считается переходом, поэтому rejected -> reviewing -> rejected между
+    двумя опросами не теряется. Снимок обновляется через commit() только
+    после доставки уведомления.
+    """
+
+    def __init__(self, snapshot=None):
+        """Создаёт снимок из {ключ: (статус, date_updated)}."""
+        self._snapshot = dict(snapshot or {})
+
+    def __len__(self):
+        """Возвращает число отслеживаемых работ."""
+        return len(self._snapshot)
+
+    def diff(self, homeworks):
+        """Возвращает список изменений относительно снимка."""
+        changes = []
+        for homework in homeworks:
+            key = homework_key(homework)
+            version = _version(homework)
+            previous = self._snapshot.get(key)
+            if previous == version:
+                continue
+            changes.append(StatusChange(
+                key,
+                homework['homework_name'],
+                previous[0] if previous else None,
+                version[0],
+                version[1],
+            ))
+        return changes
+
+    def commit(self, change):
+        """Запоминает доставленное изменение в снимке."""
+        self._snapshot[change.key] = (change.new_status, change.date_updated)
+
+
+class HomeworkIndex:
+    """
+    Индекс работ, обновляемый по каждому ответу API.
+
+    Даёт самую свежую работу за O(1), поиск по id или названию
+    и выборку работ, изменившихся после заданного момента.
+    """
+
+    def __init__(self):
+        """Создаёт пустой индекс."""
+        self._by_key = {}
+        self._keys_by_name = {}
+        self._timeline = []
+        self._latest = None
+        self._latest_moment = 0.0
+        self._applied = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Возвращает число работ в индексе."""
+        return len(self._by_key)
+
+    def update(self, homeworks):
+        """Добавляет или обновляет работы из ответа API."""
+        with self._lock:
+            # Тот же список из кэша уже учтён
+            if homeworks is self._applied:
+                return
+            self._applied = homeworks
+            rebuild_latest = False
+            for homework in homeworks:
+                key = homework_key(homework)
+                moment = updated_at(homework)
+                previous = self._by_key.get(key)
+                if previous is not None:
+                    old_moment = updated_at(previous)
+                    entry = (old_moment, key)
+                    index = bisect.bisect_left(self._timeline, entry)
+                    if (index < len(self._timeline)
+                            and self._timeline[index] == entry):
+                        del self._timeline[index]
+                    if previous is self._latest and moment < old_moment:
+                        rebuild_latest = True
+                self._by_key[key] = homework
+                self._keys_by_name[homework['homework_name']] = key
+                bisect.insort(self._timeline, (moment, key))
+                if self._latest is None or moment >= self._latest_moment:
+                    self._latest, self._latest_moment = homework, moment
+            if rebuild_latest and self._timeline:
+                self._latest_moment, key = self._timeline[-1]
+                self._latest = self._by_key[key]
+
+    def latest(self):
+        """Возвращает самую свежую работу или None."""
+        return self._latest
+
+    def get(self, key_or_name):
+        """Возвращает работу по id или по названию."""
+        with self._lock:
+            key = self._keys_by_name.get(key_or_name, str(key_or_name))
+            return self._by_key.get(key)
+
+    def changed_since(self, moment):
+        """Возвращает работы, обновлённые не раньше moment, старые первыми."""
+        with self._lock:
+            start = bisect.bisect_left(self._timeline, (float(moment), ''))
+            return [self._by_key[key] for _, key in self._timeline[start:]]
+
+
+class HomeworkIndexes:
+    """Индексы работ по токенам с вытеснением давно не нужных."""
+
+    def __init__(self, max_indexes=1024):
+        """Создаёт пустой набор индексов."""
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_token(self, token):
+        """Возвращает индекс токена, создавая его при необходимости."""
+        with self._lock:
+            index = self._indexes.get(token)
+            if index is None:
+                index = self._indexes[token] = HomeworkIndex()
+                while len(self._indexes) > self.max_indexes:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(token)
+            return index
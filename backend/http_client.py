@@ -0,0 +1,91 @@
+"""Общий HTTP-клиент с пулом keep-alive соединений."""
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from metrics import REGISTRY
+
+CONNECTIONS_REUSED = REGISTRY.counter(
+    'http_connections_reused_total',
+    'Запросы, отправленные по уже открытому keep-alive соединению.')
+CONNECTIONS_OPENED = REGISTRY.counter(
+    'http_connections_opened_total',
+    'Запросы, для которых пришлось открыть новое TCP/TLS соединение.')
+
+
+class _CountingPoolMixin:
+    """Считает переиспользованные и новые соединения пула."""
+
+    def _make_request(self, conn, *args, **kwargs):
+        # Сокета ещё нет — urllib3 сейчас установит новое соединение.
+        if getattr(conn, 'sock', None) is None:
+            CONNECTIONS_OPENED.inc()
+        else:
+            CONNECTIONS_REUSED.inc()
+        return super()._make_request(conn, *args, **kwargs)
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _CountingAdapter(HTTPAdapter):
+    """Адаптер requests, использующий пулы со счётчиками соединений."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+class PooledSession:
+    """Сессия requests с пулом соединений, таймаутами и повторами."""
+
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=30.0,
+                 retries=3, backoff_factor=0.5):
+        """Настраивает сессию и монтирует адаптеры для http и https."""
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False,
+        )
+        adapter = _CountingAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        """Выполняет GET-запрос через общий пул соединений."""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        """Закрывает все соединения пула."""
+        self.session.close()
+
+
+def connection_stats():
+    """Возвращает счётчики переиспользованных и новых соединений."""
+    return {
+        'reused': CONNECTIONS_REUSED.value,
+        'opened': CONNECTIONS_OPENED.value,
+    }
@@ -0,0 +1,111 @@
+"""
+Приём обновлений Telegram через long polling с минимальной задержкой.
+
+Поток приёма запрашивает getUpdates без пауз между запросами и только
+для нужных типов обновлений, а полученное передаёт обработчикам через
+ограниченную очередь. Таймаут long polling растёт, пока обновлений нет,
+и сокращается при активности или ошибке. Смещение последнего
+обработанного обновления сохраняется, поэтому после перезапуска
+уже обработанные обновления не приходят повторно.
+"""
+import logging
+import queue
+import threading
+import time
+
+from metrics import REGISTRY
+from resilience import Backoff
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    'telegram_updates_queue_depth',
+    'Пачки обновлений, ожидающие обработчиков.')
+RECEIVED = REGISTRY.counter(
+    'telegram_updates_total', 'Обновления, полученные через getUpdates.')
+POLL_ERRORS = REGISTRY.counter(
+    'telegram_get_updates_errors_total', 'Ошибки запроса getUpdates.')
+
+
+class UpdatePoller:
+    """Приём обновлений отдельно от их обработки."""
+
+    def __init__(self, bot, load_offset, save_offset, allowed_updates=None,
+                 min_timeout=10, max_timeout=50, queue_size=1000,
+                 batch_size=100, backoff_base=1, backoff_cap=30):
+        """
+        Создаёт приёмник для bot.
+
+        load_offset() возвращает сохранённое смещение или None,
+        save_offset(offset) запоминает его после обработки.
+        Очередь вмещает queue_size пачек обновлений.
+        """
+        self.bot = bot
+        self.load_offset = load_offset
+        self.save_offset = save_offset
+        self.allowed_updates = allowed_updates
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.batch_size = batch_size
+        self._timeout = min_timeout
+        self._queue = queue.Queue(queue_size)
+        self._backoff = Backoff(backoff_base, backoff_cap)
+
+    @property
+    def timeout(self):
+        """Текущий таймаут long polling в секундах."""
+        return self._timeout
+
+    def _adapt(self, received):
+        """Удлиняет таймаут в простое и сокращает при активности."""
+        if received:
+            self._timeout = self.min_timeout
+        else:
+            self._timeout = min(self._timeout * 2, self.max_timeout)
+
+    def _ingest(self, offset):
+        while True:
+            try:
+                updates = self.bot.get_updates(
+                    offset=offset,
+                    limit=self.batch_size,
+                    # Время ожидания ответа с запасом на long polling
+                    timeout=self._timeout + 10,
+                    allowed_updates=self.allowed_updates,
+                    long_polling_timeout=self._timeout,
+                )
+            except Exception as error:
+                POLL_ERRORS.inc()
+                self._timeout = self.min_timeout
+                delay = self._backoff.next_delay()
+                logging.error(
+                    f'Ошибка получения обновлений: {error}, '
+                    f'повтор через {delay:.1f} с')
+                time.sleep(delay)
+                continue
+            self._backoff.reset()
+            self._adapt(updates)
+            if updates:
+                RECEIVED.inc(len(updates))
+                offset = updates[-1].update_id + 1
+                # Полная очередь тормозит приём, а не теряет обновления
+                self._queue.put(updates)
+                QUEUE_DEPTH.set(self._queue.qsize())
+
+    def _dispatch(self):
+        while True:
+            updates = self._queue.get()
+            QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                self.bot.process_new_updates(updates)
+            except Exception as error:
+                logging.error(f'Ошибка обработки обновлений: {error}')
+            self.save_offset(updates[-1].update_id + 1)
+
+    def start(self):
+        """Запускает потоки приёма и передачи обработчикам."""
+        threading.Thread(
+            target=self._dispatch, name='telegram-dispatch', daemon=True
+        ).start()
+        threading.Thread(
+            target=self._ingest, args=(self.load_offset(),),
+            name='telegram-ingest', daemon=True
+        ).start()
@@ -0,0 +1,267 @@
+"""
+Простые потокобезопасные метрики бота.
+
+Registry.exposition() отдаёт все метрики в текстовом формате
+Prometheus, который читает metrics_server.
+"""
+import bisect
+import threading
+
+from collections import deque
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    def __init__(self, name, documentation, labels=None):
+        """Создаёт счётчик с нулевым значением."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Увеличивает значение счётчика."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        """Текущее значение счётчика."""
+        return self._value
+
+
+class Gauge:
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    def __init__(self, name, documentation, labels=None):
+        """Создаёт показатель с нулевым значением."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self._value = 0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set_function(self, function):
+        """Вычисляет значение вызовом function() при каждом чтении."""
+        self._function = function
+
+    def set(self, value):
+        """Устанавливает значение показателя."""
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        """Увеличивает значение показателя."""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        """Уменьшает значение показателя."""
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self):
+        """Текущее значение показателя."""
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+
+class Histogram:
+    """Распределение значений по корзинам с верхними границами."""
+
+    def __init__(self, name, documentation, labels=None,
+                 buckets=DEFAULT_BUCKETS):
+        """Создаёт пустую гистограмму."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.buckets = tuple(sorted(buckets))
+        # Последняя корзина — всё, что больше самой верхней границы
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учитывает одно наблюдение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Возвращает накопленные счётчики корзин, сумму и количество."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class Summary:
+    """Квантили по последним наблюдениям в скользящем окне."""
+
+    def __init__(self, name, documentation, labels=None,
+                 quantiles=DEFAULT_QUANTILES, max_samples=1024):
+        """Создаёт пустую сводку."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.quantiles = tuple(quantiles)
+        self._samples = deque(maxlen=max_samples)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Учитывает одно наблюдение."""
+        with self._lock:
+            self._samples.append(value)
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Возвращает {квантиль: значение}, сумму и количество."""
+        with self._lock:
+            samples = sorted(self._samples)
+            total, count = self._sum, self._count
+        if not samples:
+            return {quantile: 0.0 for quantile in self.quantiles}, 0.0, 0
+        last = len(samples) - 1
+        values = {
+            quantile: samples[min(last, int(quantile * len(samples)))]
+            for quantile in self.quantiles
+        }
+        return values, total, count
+
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels.items())
+    if extra is not None:
+        items.append(extra)
+    if not items:
+        return ''
+    pairs = [
+        f'{name}="{_escape(str(value))}"' for name, value in items]
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _samples(metric):
+    """Возвращает строки образцов метрики в формате Prometheus."""
+    name, labels = metric.name, metric.labels
+    suffix = _format_labels(labels)
+    if isinstance(metric, Histogram):
+        cumulative, total, count = metric.snapshot()
+        bounds = (*metric.buckets, float('inf'))
+        lines = [
+            f'{name}_bucket'
+            f'{_format_labels(labels, ("le", _format_value(bound)))} {value}'
+            for bound, value in zip(bounds, cumulative)
+        ]
+    elif isinstance(metric, Summary):
+        quantiles, total, count = metric.snapshot()
+        lines = [
+            f'{name}{_format_labels(labels, ("quantile", quantile))} '
+            f'{_format_value(value)}'
+            for quantile, value in quantiles.items()
+        ]
+    else:
+        return [f'{name}{suffix} {_format_value(metric.value)}']
+    lines.append(f'{name}_sum{suffix} {_format_value(total)}')
+    lines.append(f'{name}_count{suffix} {count}')
+    return lines
+
+
+TYPES = {
+    Counter: 'counter',
+    Gauge: 'gauge',
+    Histogram: 'histogram',
+    Summary: 'summary',
+}
+
+
+class Registry:
+    """Реестр всех метрик процесса."""
+
+    def __init__(self):
+        """Создаёт пустой реестр."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labels, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, documentation, labels, **kwargs)
+                self._metrics[key] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=None):
+        """Возвращает счётчик по имени, создавая его при необходимости."""
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, labels=None):
+        """Возвращает показатель по имени, создавая его при необходимости."""
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=None,
+                  buckets=DEFAULT_BUCKETS):
+        """Возвращает гистограмму по имени, создавая её при необходимости."""
+        return self._get_or_create(
+            Histogram, name, documentation, labels, buckets=buckets)
+
+    def summary(self, name, documentation, labels=None,
+                quantiles=DEFAULT_QUANTILES):
+        """Возвращает сводку по имени, создавая её при необходимости."""
+        return self._get_or_create(
+            Summary, name, documentation, labels, quantiles=quantiles)
+
+    def collect(self):
+        """Возвращает список всех зарегистрированных метрик."""
+        with self._lock:
+            return list(self._metrics.values())
+
+    def exposition(self):
+        """Возвращает все метрики в текстовом формате Prometheus."""
+        families = {}
+        for metric in self.collect():
+            families.setdefault(metric.name, []).append(metric)
+        lines = []
+        for name in sorted(families):
+            metrics = families[name]
+            lines.append(
+                f'# HELP {name} {_escape(metrics[0].documentation)}')
+            lines.append(f'# TYPE {name} {TYPES[type(metrics[0])]}')
+            for metric in metrics:
+                lines.extend(_samples(metric))
+        lines.append('')
+        return '\n'.join(lines)
+
+
+REGISTRY = Registry()
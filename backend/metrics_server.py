@@ -0,0 +1,83 @@
+"""
+HTTP-эндпоинт /metrics в формате Prometheus.
+
+Сервер работает в отдельном потоке на стандартной библиотеке, поэтому
+подходит и для режима потоков, и для asyncio. Сбор метрик только
+читает счётчики под короткими блокировками; готовый текст живёт
+min_interval секунд, так что частые опросы не нагружают бота.
+"""
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import REGISTRY
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SCRAPE_SECONDS = REGISTRY.histogram(
+    'metrics_scrape_seconds', 'Время сборки ответа /metrics.')
+
+
+class MetricsServer:
+    """Отдаёт метрики реестра по HTTP."""
+
+    def __init__(self, registry=REGISTRY, path='/metrics', min_interval=1.0,
+                 clock=time.monotonic):
+        """Создаёт сервер; слушать порт он начинает в start_in_thread."""
+        self.registry = registry
+        self.path = path
+        self.min_interval = min_interval
+        self._clock = clock
+        self._body = None
+        self._rendered_at = 0.0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def render(self):
+        """Возвращает текст метрик, пересобирая его не чаще min_interval."""
+        with self._lock:
+            now = self._clock()
+            if (self._body is None
+                    or now - self._rendered_at >= self.min_interval):
+                started = time.monotonic()
+                self._body = self.registry.exposition().encode()
+                self._rendered_at = now
+                SCRAPE_SECONDS.observe(time.monotonic() - started)
+            return self._body
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != server.path:
+                    self.send_error(404)
+                    return
+                body = server.render()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Опросы каждые несколько секунд не засоряют лог
+                pass
+
+        return Handler
+
+    def start_in_thread(self, host='127.0.0.1', port=9100):
+        """Начинает слушать порт и обслуживает запросы в фоновом потоке."""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        thread = threading.Thread(
+            target=self._server.serve_forever, name='metrics', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Останавливает сервер."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,347 @@
+"""
+Очередь исходящих сообщений Telegram с пулом отправителей.
+
+Соблюдает ограничения Telegram: общий темп отправки, не чаще одного
+сообщения в секунду в личный чат и 20 в минуту в группу. Ответ 429
+с retry_after приостанавливает все отправки. Сообщения одного чата
+уходят строго по очереди. Очередь есть в двух вариантах: с пулом
+потоков и с задачами asyncio.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import REGISTRY
+from ratelimit import TokenBucket
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    'telegram_outbound_queue_depth', 'Сообщения, ожидающие отправки.')
+SEND_SECONDS = REGISTRY.histogram(
+    'telegram_send_seconds', 'Длительность вызова отправки в Telegram.')
+QUEUE_SECONDS = REGISTRY.histogram(
+    'telegram_queue_seconds',
+    'Время от постановки сообщения в очередь до отправки.')
+RATE_LIMITED = REGISTRY.counter(
+    'telegram_rate_limited_total', 'Ответы Telegram 429 Too Many Requests.')
+DROPPED = REGISTRY.counter(
+    'telegram_outbound_dropped_total',
+    'Сообщения, не принятые переполненной очередью.')
+
+# Чат не найден, бот удалён из канала или заблокирован: повтор не поможет
+PERMANENT_ERROR_CODES = (400, 403)
+
+
+def retry_after(error):
+    """Возвращает retry_after из ответа 429 или None."""
+    # Синхронный и асинхронный клиенты бросают разные классы ошибок
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    result_json = getattr(error, 'result_json', None) or {}
+    parameters = result_json.get('parameters') or {}
+    return float(parameters.get('retry_after', 1))
+
+
+def is_permanent_failure(error):
+    """Проверяет, что Telegram окончательно отказал в доставке."""
+    return getattr(error, 'error_code', None) in PERMANENT_ERROR_CODES
+
+
+class _Outgoing:
+    __slots__ = ('chat_id', 'func', 'args', 'kwargs', 'future', 'queued_at')
+
+    def __init__(self, chat_id, func, args, kwargs, future):
+        self.chat_id = chat_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class _BaseOutboundQueue:
+    """Общее расписание отправки потоковой и асинхронной очередей."""
+
+    def __init__(self, send, workers=4, global_rate=30.0, chat_rate=1.0,
+                 group_rate=20 / 60, max_size=10000):
+        self._send = send
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_size = max_size
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self._ready = []
+        self._next_allowed = {}
+        self._size = 0
+        self._paused_until = 0.0
+        self._sequence = itertools.count()
+
+    def _interval(self, chat_id):
+        # У групп и каналов отрицательные id и более строгий лимит
+        group = str(chat_id).startswith(('-', '@'))
+        rate = self.group_rate if group else self.chat_rate
+        return 1 / rate
+
+    def _push_ready(self, chat_id, due):
+        heapq.heappush(self._ready, (due, next(self._sequence), chat_id))
+
+    def _add(self, item):
+        """Ставит сообщение в очередь чата; False, если очередь полна."""
+        if self._size >= self.max_size:
+            DROPPED.inc()
+            logging.error(
+                f'Очередь отправки переполнена, сообщение '
+                f'в чат {item.chat_id} отброшено')
+            return False
+        queue = self._chats.get(item.chat_id)
+        if queue is None:
+            queue = self._chats[item.chat_id] = deque()
+            due = max(time.monotonic(),
+                      self._next_allowed.get(item.chat_id, 0.0))
+            self._push_ready(item.chat_id, due)
+        queue.append(item)
+        self._size += 1
+        QUEUE_DEPTH.set(self._size)
+        return True
+
+    def _pop_due(self):
+        """
+        Забирает сообщение чата, которому уже можно отправить.
+
+        Возвращает (сообщение, None) или (None, сколько ждать);
+        пауза None означает, что очередь пуста.
+        """
+        now = time.monotonic()
+        if not self._ready:
+            return None, None
+        if self._paused_until > now:
+            return None, self._paused_until - now
+        due, _, chat_id = self._ready[0]
+        if due > now:
+            return None, due - now
+        delay = self._global.delay()
+        if delay > 0:
+            return None, delay
+        self._global.take()
+        heapq.heappop(self._ready)
+        item = self._chats[chat_id].popleft()
+        self._size -= 1
+        QUEUE_DEPTH.set(self._size)
+        return item, None
+
+    def _reschedule(self, item, requeue_at=None):
+        """Возвращает чат в расписание после попытки отправки."""
+        chat_id = item.chat_id
+        queue = self._chats[chat_id]
+        if requeue_at is not None:
+            queue.appendleft(item)
+            self._size += 1
+            QUEUE_DEPTH.set(self._size)
+            due = requeue_at
+        else:
+            due = time.monotonic() + self._interval(chat_id)
+            self._next_allowed[chat_id] = due
+        if queue:
+            self._push_ready(chat_id, due)
+        else:
+            del self._chats[chat_id]
+        self._prune()
+
+    def _prune(self):
+        """Забывает чаты, чей интервал давно истёк."""
+        if len(self._next_allowed) <= self.max_size:
+            return
+        now = time.monotonic()
+        for chat_id, allowed in list(self._next_allowed.items()):
+            if allowed < now:
+                del self._next_allowed[chat_id]
+
+    def _retry_at(self, error):
+        """
+        Разбирает ошибку отправки.
+
+        На 429 приостанавливает отправку и возвращает, когда повторить;
+        для прочих ошибок возвращает None.
+        """
+        pause = retry_after(error)
+        if pause is None:
+            logging.error(f'Ошибка при отправке сообщения: {error}')
+            return None
+        RATE_LIMITED.inc()
+        logging.warning(
+            f'Telegram просит подождать {pause} с, '
+            f'отправка приостановлена')
+        self._paused_until = max(
+            self._paused_until, time.monotonic() + pause)
+        return self._paused_until
+
+    def _observe(self, item, started):
+        SEND_SECONDS.observe(time.monotonic() - started)
+        QUEUE_SECONDS.observe(started - item.queued_at)
+
+    def depth(self):
+        """Возвращает число сообщений в очереди."""
+        return self._size
+
+
+class OutboundQueue(_BaseOutboundQueue):
+    """Очередь отправки с ограничениями на чат и на весь бот."""
+
+    def __init__(self, *args, **kwargs):
+        """
+        Создаёт очередь; send(chat_id, text, **kwargs) отправляет сообщение.
+
+        Потоки-отправители запускаются при первой постановке в очередь.
+        """
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f'telegram-send-{number}',
+                daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, chat_id, text, **kwargs):
+        """
+        Ставит сообщение в очередь и возвращает Future с итогом.
+
+        Итог — True, False при переполненной очереди или исключение,
+        с которым не удалась отправка.
+        """
+        return self.submit(chat_id, self._send, chat_id, text, **kwargs)
+
+    def submit(self, chat_id, func, *args, **kwargs):
+        """
+        Ставит в очередь произвольный вызов Telegram API для чата.
+
+        func(*args, **kwargs) выполняется с теми же ограничениями
+        и в том же порядке, что и сообщения этого чата.
+        """
+        # Чат из хранилища приходит строкой, из обработчика — числом
+        item = _Outgoing(str(chat_id), func, args, kwargs, Future())
+        with self._cond:
+            if not self._threads:
+                self._start()
+            if not self._add(item):
+                item.future.set_result(False)
+                return item.future
+            self._cond.notify()
+        return item.future
+
+    def _take(self):
+        """Ждёт чат, которому можно отправить, и забирает его сообщение."""
+        with self._cond:
+            while True:
+                item, wait = self._pop_due()
+                if item is not None:
+                    return item
+                self._cond.wait(wait)
+
+    def _finish(self, item, requeue_at=None):
+        with self._cond:
+            self._reschedule(item, requeue_at)
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            item = self._take()
+            started = time.monotonic()
+            try:
+                item.func(*item.args, **item.kwargs)
+            except Exception as error:
+                SEND_SECONDS.observe(time.monotonic() - started)
+                with self._cond:
+                    requeue_at = self._retry_at(error)
+                self._finish(item, requeue_at)
+                if requeue_at is None:
+                    item.future.set_exception(error)
+                continue
+            self._observe(item, started)
+            self._finish(item)
+            item.future.set_result(True)
+
+
+class AsyncOutboundQueue(_BaseOutboundQueue):
+    """
+    Очередь отправки для асинхронного режима.
+
+    send и вызовы submit — корутинные функции; отправители — задачи
+    цикла событий, запущенные при первой постановке в очередь.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Создаёт очередь; send(chat_id, text, **kwargs) — корутина."""
+        super().__init__(*args, **kwargs)
+        self._wakeup = None
+        self._tasks = []
+
+    def _start(self):
+        self._wakeup = asyncio.Event()
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    def enqueue(self, chat_id, text, **kwargs):
+        """
+        Ставит сообщение в очередь и возвращает asyncio.Future с итогом.
+
+        Итог тот же, что у OutboundQueue.enqueue; ждать его
+        не обязательно.
+        """
+        return self.submit(chat_id, self._send, chat_id, text, **kwargs)
+
+    def submit(self, chat_id, func, *args, **kwargs):
+        """Ставит в очередь корутину Telegram API для чата."""
+        future = asyncio.get_running_loop().create_future()
+        item = _Outgoing(str(chat_id), func, args, kwargs, future)
+        if not self._tasks:
+            self._start()
+        if not self._add(item):
+            future.set_result(False)
+            return future
+        self._wakeup.set()
+        return future
+
+    async def _take(self):
+        while True:
+            item, wait = self._pop_due()
+            if item is not None:
+                return item
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        while True:
+            item = await self._take()
+            started = time.monotonic()
+            try:
+                await item.func(*item.args, **item.kwargs)
+            except Exception as error:
+                SEND_SECONDS.observe(time.monotonic() - started)
+                requeue_at = self._retry_at(error)
+                self._reschedule(item, requeue_at)
+                self._wakeup.set()
+                # Ожидавшую итог задачу могли отменить
+                if requeue_at is None and not item.future.done():
+                    item.future.set_exception(error)
+                    # Ошибка уже в логе: ответ без ожидающих не должен
+                    # ругаться на неполученное исключение
+                    item.future.exception()
+                continue
+            self._observe(item, started)
+            self._reschedule(item)
+            self._wakeup.set()
+            if not item.future.done():
+                item.future.set_result(True)
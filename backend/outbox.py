@@ -0,0 +1,229 @@
+"""
+Надёжная доставка уведомлений через таблицу outbox.
+
+Уведомление записывается в хранилище вместе со статусом работы,
+а фоновый поток отправляет недоставленные пачками. После перезапуска
+оставшиеся в outbox сообщения отправляются заново. Ключ уведомления
+составлен из чата, работы, статуса и date_updated, поэтому повторно
+обнаруженное изменение не дублирует сообщение. Уведомления, которые
+Telegram окончательно отказался доставить, помечаются как мёртвые
+и больше не отправляются.
+"""
+import functools
+import logging
+import threading
+import time
+
+from metrics import REGISTRY
+from resilience import Backoff
+
+DELIVERED = REGISTRY.counter(
+    'outbox_delivered_total', 'Уведомления, доставленные из outbox.')
+FAILED = REGISTRY.counter(
+    'outbox_failed_total', 'Неудачные попытки доставки из outbox.')
+DEAD = REGISTRY.counter(
+    'outbox_dead_total', 'Уведомления, которые доставить невозможно.')
+
+# Предел длины сообщения Telegram с запасом на заголовок сводки
+MESSAGE_LIMIT = 4000
+
+
+def outbox_key(chat_id, change):
+    """Возвращает ключ идемпотентности уведомления об изменении."""
+    return f'{chat_id}:{change.key}:{change.new_status}:{change.date_updated}'
+
+
+class OutboxDrainer:
+    """
+    Фоновая отправка недоставленных уведомлений из outbox.
+
+    Уведомления одного чата объединяются в одно сообщение: после
+    очередного уведомления отправка ждёт window секунд, но не дольше
+    max_latency от самого раннего из ожидающих. Разные чаты получают
+    сообщения параллельно: доставка не ждёт медленных получателей,
+    а чат с ошибкой повторяет отправку по своей паузе. Из хранилища
+    читаются только чаты, которые не заняты отправкой и не ждут
+    повтора, и не больше chat_batch_size уведомлений от каждого.
+    """
+
+    def __init__(self, store, send, batch_size=50, chat_batch_size=20,
+                 backoff_base=5, backoff_cap=600, window=0, max_latency=0,
+                 merge=None, permanent=None, clock=time.time):
+        """
+        Создаёт отправителя outbox.
+
+        send(chat_id, text) возвращает Future с признаком доставки
+        или исключением, merge(texts) собирает одно сообщение
+        из нескольких, permanent(error) отличает ошибки, после которых
+        повторять отправку бессмысленно.
+        """
+        self.store = store
+        self.send = send
+        self.batch_size = batch_size
+        self.chat_batch_size = chat_batch_size
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.window = window
+        self.max_latency = max(max_latency, window)
+        self.merge = merge or '\n\n'.join
+        self.permanent = permanent or (lambda error: False)
+        self._clock = clock
+        self._backoff = Backoff(backoff_base, backoff_cap)
+        self._failures = {}
+        # Ключ отправляемого уведомления -> его чат
+        self._inflight = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _ready_at(self, rows):
+        """Возвращает момент, когда накопленные уведомления пора отправить."""
+        created = [row[3] for row in rows]
+        return min(max(created) + self.window, min(created) + self.max_latency)
+
+    def _chunks(self, rows):
+        """Делит уведомления чата на части в пределах длины сообщения."""
+        chunk, length = [], 0
+        for row in rows:
+            if chunk and length + len(row[2]) > MESSAGE_LIMIT:
+                yield chunk
+                chunk, length = [], 0
+            chunk.append(row)
+            length += len(row[2]) + 2
+        if chunk:
+            yield chunk
+
+    def batch(self):
+        """
+        Возвращает готовые сообщения и паузу до следующего готового.
+
+        Сообщение — (ключи, чат, текст); пауза None, если ждать нечего.
+        Чаты с неотправленными ещё сообщениями пропускаются, чтобы
+        не нарушить порядок.
+        """
+        now = self._clock()
+        with self._lock:
+            busy = set(self._inflight.values())
+            retry_at = {chat_id: moment
+                        for chat_id, (_, moment) in self._failures.items()
+                        if moment > now and chat_id not in busy}
+        wait = min(retry_at.values(), default=None)
+        if wait is not None:
+            wait -= now
+        by_chat = {}
+        rows = self.store.pending_outbox(
+            self.batch_size, self.chat_batch_size, busy | set(retry_at))
+        for row in rows:
+            by_chat.setdefault(row[1], []).append(row)
+        messages = []
+        for chat_id, rows in by_chat.items():
+            ready_at = self._ready_at(rows)
+            if ready_at > now:
+                wait = ready_at - now if wait is None else min(
+                    wait, ready_at - now)
+                continue
+            for chunk in self._chunks(rows):
+                messages.append((
+                    [row[0] for row in chunk],
+                    chat_id,
+                    self.merge([row[2] for row in chunk]),
+                ))
+        return messages, wait
+
+    def begin(self, message):
+        """Отмечает сообщение отправляемым."""
+        keys, chat_id, _ = message
+        with self._lock:
+            self._inflight.update(dict.fromkeys(keys, chat_id))
+
+    def settle(self, message, delivered, error=None):
+        """
+        Учитывает итог доставки сообщения получателю.
+
+        Если error окончательная, уведомления сообщения помечаются
+        мёртвыми и больше не отправляются.
+        """
+        keys, chat_id, _ = message
+        dead = not delivered and error is not None and self.permanent(error)
+        # Сначала отметка в хранилище, иначе batch() отправит повторно
+        if delivered:
+            for key in keys:
+                self.store.mark_delivered(key)
+            DELIVERED.inc(len(keys))
+        elif dead:
+            for key in keys:
+                self.store.mark_dead(key, str(error))
+            DEAD.inc(len(keys))
+        else:
+            FAILED.inc()
+        with self._lock:
+            for key in keys:
+                self._inflight.pop(key, None)
+            stats = self._stats.setdefault(chat_id, [0, 0])
+            if delivered:
+                stats[0] += len(keys)
+                self._failures.pop(chat_id, None)
+                return
+            stats[1] += 1
+            if dead:
+                self._failures.pop(chat_id, None)
+            else:
+                backoff, _ = self._failures.get(chat_id, (None, 0))
+                if backoff is None:
+                    backoff = Backoff(self.backoff_base, self.backoff_cap)
+                delay = backoff.next_delay()
+                self._failures[chat_id] = (backoff, self._clock() + delay)
+        if dead:
+            logging.error(
+                f'Уведомления в чат {chat_id} не будут доставлены: {error}')
+        else:
+            logging.warning(
+                f'Уведомление в чат {chat_id} не доставлено, '
+                f'повтор через {delay:.1f} с')
+
+    def stats(self):
+        """Возвращает {чат: (доставлено, неудачных попыток)}."""
+        with self._lock:
+            return {chat_id: tuple(value)
+                    for chat_id, value in self._stats.items()}
+
+    def _on_done(self, message, future):
+        error = future.exception()
+        self.settle(message, error is None and future.result(), error)
+        self.wake()
+
+    def drain_once(self):
+        """Отправляет готовые сообщения и возвращает паузу до следующих."""
+        messages, wait = self.batch()
+        for message in messages:
+            self.begin(message)
+            _, chat_id, text = message
+            self.send(chat_id, text).add_done_callback(
+                functools.partial(self._on_done, message))
+        return wait
+
+    def wake(self):
+        """Будит отправку после записи новых уведомлений."""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            # Сбрасываем до чтения пачки, чтобы не потерять wake()
+            self._wakeup.clear()
+            try:
+                delay = self.drain_once()
+            except Exception as error:
+                logging.error(f'Ошибка отправки из outbox: {error}')
+                delay = self._backoff.next_delay()
+            else:
+                self._backoff.reset()
+            # Завершённые отправки и новые уведомления будят поток
+            self._wakeup.wait(delay)
+
+    def start(self):
+        """Запускает фоновый поток; первая пачка досылает старые."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='outbox-drainer', daemon=True)
+            self._thread.start()
@@ -0,0 +1,158 @@
+"""
+Конвейер опроса: запрос, проверка, сравнение, подготовка и доставка.
+
+Каждая стадия выполняется своим пулом потоков и передаёт задание
+следующей через ограниченную очередь. Пока одни студенты ждут ответа
+API, ответы других уже проверяются и превращаются в уведомления.
+Заполненная очередь задерживает предыдущую стадию, поэтому медленная
+стадия не копит задания в памяти. Время каждой стадии пишется
+в гистограмму pipeline_stage_seconds.
+"""
+import queue
+import threading
+import time
+
+from collections import namedtuple
+from concurrent.futures import Future
+
+from metrics import REGISTRY
+
+Stage = namedtuple('Stage', 'name func workers')
+
+# Метка в очереди стадии: поток, получивший её, завершается
+_STOP = object()
+
+
+class PollJob:
+    """Задание опроса одного владельца, дополняемое стадиями."""
+
+    def __init__(self, owner, cursor, token=None, chat_id=None, diff=None):
+        """
+        Создаёт задание.
+
+        chat_id — получатель уведомлений, None — все NOTIFY_TARGETS;
+        diff — снимок статусов, если владелец держит его в памяти.
+        """
+        self.owner = owner
+        self.cursor = cursor
+        self.token = token
+        self.chat_id = chat_id
+        self.diff = diff
+        self.response = None
+        self.homeworks = None
+        self.changes = None
+        self.texts = None
+
+
+class Pipeline:
+    """Стадии с собственными потоками и очередями между ними."""
+
+    def __init__(self, name, stages, queue_size=100):
+        """
+        Создаёт конвейер; потоки запускаются при первом задании.
+
+        Функция стадии возвращает задание для следующей стадии
+        или None, если дальше его передавать не нужно.
+        """
+        self.name = name
+        self.stages = list(stages)
+        self._queues = [queue.Queue(queue_size) for _ in self.stages]
+        self._threads = []
+        self._stopped = False
+        self._lock = threading.Lock()
+        labels = [{'pipeline': name, 'stage': stage.name}
+                  for stage in self.stages]
+        self._depth = [
+            REGISTRY.gauge(
+                'pipeline_queue_depth', 'Задания, ожидающие стадии.',
+                labels=stage_labels)
+            for stage_labels in labels
+        ]
+        self._seconds = [
+            REGISTRY.histogram(
+                'pipeline_stage_seconds', 'Время выполнения стадии.',
+                labels=stage_labels)
+            for stage_labels in labels
+        ]
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for index, stage in enumerate(self.stages):
+                for number in range(stage.workers):
+                    thread = threading.Thread(
+                        target=self._work, args=(index,),
+                        name=f'{self.name}-{stage.name}-{number}',
+                        daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _put(self, index, job, future):
+        # Блокируется, пока стадия не освободит место
+        self._queues[index].put((job, future))
+        self._depth[index].set(self._queues[index].qsize())
+
+    def submit(self, job):
+        """
+        Передаёт задание первой стадии и возвращает Future.
+
+        Future завершается заданием после последней стадии, None, если
+        стадия остановила задание, или исключением стадии.
+        """
+        if self._stopped:
+            raise RuntimeError(f'Конвейер {self.name} остановлен')
+        if not self._threads:
+            self._start()
+        future = Future()
+        self._put(0, job, future)
+        return future
+
+    def stop(self):
+        """
+        Дорабатывает принятые задания и останавливает потоки стадий.
+
+        Стадии останавливаются по порядку, поэтому задание, принятое
+        до остановки, успевает пройти весь конвейер.
+        """
+        with self._lock:
+            self._stopped = True
+            threads, self._threads = self._threads, []
+        offset = 0
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                self._queues[index].put(_STOP)
+            for thread in threads[offset:offset + stage.workers]:
+                thread.join()
+            offset += stage.workers
+
+    def timings(self):
+        """Возвращает {стадия: (заданий, среднее время в секундах)}."""
+        timings = {}
+        for stage, histogram in zip(self.stages, self._seconds):
+            _, total, count = histogram.snapshot()
+            timings[stage.name] = (count, total / count if count else 0.0)
+        return timings
+
+    def _work(self, index):
+        stage = self.stages[index]
+        stage_queue = self._queues[index]
+        last = index == len(self.stages) - 1
+        while True:
+            item = stage_queue.get()
+            if item is _STOP:
+                return
+            job, future = item
+            self._depth[index].set(stage_queue.qsize())
+            started = time.monotonic()
+            try:
+                result = stage.func(job)
+            except Exception as error:
+                future.set_exception(error)
+                continue
+            finally:
+                self._seconds[index].observe(time.monotonic() - started)
+            if result is None or last:
+                future.set_result(result)
+            else:
+                self._put(index + 1, result, future)
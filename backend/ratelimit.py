@@ -0,0 +1,216 @@
+"""
+Ограничение частоты запросов к API Практикума.
+
+Перед каждым запросом берётся токен из корзины этого токена Практикума,
+а затем из общей корзины процесса. В общей очереди запросы пользователя
+(/status) обслуживаются раньше фонового опроса. Скользящее окно
+ограничивает запросы статуса из одного чата.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+from metrics import REGISTRY
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+WAIT_SECONDS = {
+    priority: REGISTRY.histogram(
+        'practicum_ratelimit_wait_seconds',
+        'Время ожидания запроса к API в ограничителе частоты.',
+        labels={'priority': name})
+    for priority, name in PRIORITY_NAMES.items()
+}
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', '_clock')
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        """Создаёт полную корзину."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Возвращает, сколько ждать до появления токена."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Забирает токен, наличие которого проверено через delay()."""
+        self.tokens -= 1
+
+    def reserve(self):
+        """Резервирует токен в долг и возвращает время ожидания."""
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    @property
+    def full(self):
+        """Корзина полна и её можно не хранить."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class _BaseRateLimiter:
+    """Общая часть синхронного и асинхронного ограничителей."""
+
+    def __init__(self, rate, burst, key_rate, key_burst, max_keys=10000,
+                 clock=time.monotonic):
+        self._clock = clock
+        self._global = TokenBucket(rate, burst, clock)
+        self._key_rate = key_rate
+        self._key_burst = key_burst
+        self._max_keys = max_keys
+        self._keys = OrderedDict()
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def _reserve_key(self, key):
+        """Резервирует токен в корзине ключа; вызывается под блокировкой."""
+        bucket = self._keys.get(key)
+        if bucket is None:
+            bucket = self._keys[key] = TokenBucket(
+                self._key_rate, self._key_burst, self._clock)
+            # Полные корзины можно выбросить: новая будет такой же
+            while len(self._keys) > self._max_keys:
+                oldest, oldest_bucket = next(iter(self._keys.items()))
+                if not oldest_bucket.full:
+                    break
+                del self._keys[oldest]
+        self._keys.move_to_end(key)
+        return bucket.reserve()
+
+    def _observe(self, priority, started):
+        WAIT_SECONDS[priority].observe(self._clock() - started)
+
+
+class RateLimiter(_BaseRateLimiter):
+    """Ограничитель частоты для потокового режима."""
+
+    def __init__(self, *args, **kwargs):
+        """Создаёт ограничитель с общей и ключевыми корзинами."""
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+
+    def acquire(self, key=None, priority=BACKGROUND):
+        """Блокирует поток, пока запрос не разрешён."""
+        started = self._clock()
+        if key is not None:
+            with self._cond:
+                delay = self._reserve_key(key)
+            if delay:
+                time.sleep(delay)
+
+        with self._cond:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, entry)
+            while True:
+                if self._waiters[0] == entry:
+                    delay = self._global.delay()
+                    if delay <= 0:
+                        self._global.take()
+                        heapq.heappop(self._waiters)
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+        self._observe(priority, started)
+
+
+class AsyncRateLimiter(_BaseRateLimiter):
+    """Ограничитель частоты для асинхронного режима."""
+
+    async def acquire(self, key=None, priority=BACKGROUND):
+        """Ожидает разрешения на запрос, не блокируя цикл событий."""
+        started = self._clock()
+        if key is not None:
+            delay = self._reserve_key(key)
+            if delay:
+                await asyncio.sleep(delay)
+
+        wakeup = asyncio.Event()
+        entry = (priority, next(self._sequence), wakeup)
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                if self._waiters[0] is entry:
+                    delay = self._global.delay()
+                    if delay <= 0:
+                        self._global.take()
+                        heapq.heappop(self._waiters)
+                        break
+                    await asyncio.sleep(delay)
+                else:
+                    await wakeup.wait()
+                    wakeup.clear()
+        except asyncio.CancelledError:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            raise
+        finally:
+            # Будим нового первого в очереди
+            if self._waiters:
+                self._waiters[0][2].set()
+        self._observe(priority, started)
+
+
+class SlidingWindowThrottle:
+    """Не больше limit событий за window секунд для каждого ключа."""
+
+    def __init__(self, name, limit, window, max_keys=10000,
+                 clock=time.monotonic):
+        """Создаёт ограничитель без истории событий."""
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+        self._rejected = REGISTRY.counter(
+            'throttle_rejected_total',
+            'События, не уложившиеся в скользящее окно.',
+            labels={'name': name})
+
+    def allow(self, key):
+        """Учитывает событие и возвращает, укладывается ли оно в лимит."""
+        now = self._clock()
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                events = self._events[key] = deque()
+                while len(self._events) > self.max_keys:
+                    self._events.popitem(last=False)
+            self._events.move_to_end(key)
+            while events and events[0] <= now - self.window:
+                events.popleft()
+            if len(events) < self.limit:
+                events.append(now)
+                return True
+        self._rejected.inc()
+        return False
@@ -0,0 +1,106 @@
+"""
+Шаблоны сообщений и готовая разметка клавиатуры.
+
+Шаблоны собираются один раз на язык: вердикт каждого статуса уже
+подставлен, при отправке остаётся подставить название работы.
+Клавиатура сериализуется в JSON один раз, и Telegram получает готовую
+строку без построения объектов на каждый ответ.
+"""
+import functools
+
+from telebot import types
+
+DEFAULT_LOCALE = 'ru'
+
+LOCALES = {
+    'ru': {
+        'verdicts': {
+            'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+            'reviewing': 'Работа взята на проверку ревьюером.',
+            'rejected': 'Работа проверена: у ревьюера есть замечания.',
+        },
+        'status': 'Статус работы "{homework_name}": {verdict}',
+        'latest': (
+            "Работа: {homework_name}\n"
+            "Статус: {verdict}\n"
+            "Последнее обновление: '{updated}"
+        ),
+        'changed': (
+            "Статус изменён!\n"
+            "Работа: {homework_name}\n"
+            "Новый статус: {verdict}"
+        ),
+        'board_line': '{homework_name}: {verdict}',
+        'board_header': 'Статусы работ:',
+        'digest_header': 'Изменений статусов: {count}',
+        'no_data': (
+            'Данные о домашней работе ещё не получены. Попробуйте позже.'),
+        'button': 'Проверить статус домашнего задания',
+        'keyboard_prompt': (
+            'Нажмите кнопку, чтобы проверить статус домашнего задания.'),
+        'owner_only': 'Статус доступен только чатам владельца бота.',
+        'status_error': 'Ошибка при получении статуса: {error}',
+        'unexpected_error': 'Неожиданная ошибка: {error}',
+        'register_first': (
+            'Сначала зарегистрируйте токен Практикума: /register <токен>'),
+        'register_usage': 'Использование: /register <токен>',
+        'token_rejected': 'Токен не принят: {error}',
+        'registered': 'Токен сохранён, я сообщу об изменении статуса работы.',
+        'unregistered': 'Токен удалён, уведомления отключены.',
+        'not_registered': 'Токен не был зарегистрирован.',
+    },
+}
+
+# Шаблоны, в которые подставляется вердикт статуса
+STATUS_TEMPLATES = ('status', 'latest', 'changed', 'board_line')
+
+
+def _bind(template, verdict):
+    """Подставляет вердикт в шаблон, оставляя прочие поля."""
+    escaped = verdict.replace('{', '{{').replace('}', '}}')
+    return template.replace('{verdict}', escaped)
+
+
+class Templates:
+    """Шаблоны одного языка, собранные для каждого статуса."""
+
+    def __init__(self, texts):
+        """Собирает шаблоны из словаря текстов языка."""
+        self.texts = texts
+        self.verdicts = texts['verdicts']
+        self._bound = {
+            name: {status: _bind(texts[name], verdict)
+                   for status, verdict in self.verdicts.items()}
+            for name in STATUS_TEMPLATES
+        }
+
+    def render(self, name, status, **values):
+        """
+        Заполняет шаблон статуса.
+
+        Для неизвестного статуса вместо вердикта выводится сам статус.
+        """
+        template = self._bound[name].get(status)
+        if template is None:
+            return self.texts[name].format(verdict=status, **values)
+        return template.format(**values)
+
+    def text(self, name, **values):
+        """Возвращает текст без статуса, заполняя поля при наличии."""
+        if values:
+            return self.texts[name].format(**values)
+        return self.texts[name]
+
+
+@functools.lru_cache(maxsize=None)
+def templates(locale=DEFAULT_LOCALE):
+    """Возвращает шаблоны языка; неизвестный язык заменяется основным."""
+    return Templates(LOCALES.get(locale, LOCALES[DEFAULT_LOCALE]))
+
+
+@functools.lru_cache(maxsize=None)
+def status_keyboard(locale=DEFAULT_LOCALE):
+    """Возвращает клавиатуру с кнопкой статуса, готовую к отправке."""
+    keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True)
+    keyboard.add(types.KeyboardButton(templates(locale).text('button')))
+    return keyboard.to_json()
@@ -0,0 +1,124 @@
+"""Повторы с экспоненциальной задержкой и предохранитель для внешних API."""
+import logging
+import random
+import threading
+import time
+
+from exceptions import CircuitOpenError
+from metrics import REGISTRY
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Числовые значения состояния для метрик и алертов
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+def is_service_failure(status_code):
+    """Проверяет, говорит ли HTTP-статус о сбое самого сервиса."""
+    return status_code >= 500 or status_code == 429
+
+
+class Backoff:
+    """Экспоненциальная задержка с полным джиттером и верхней границей."""
+
+    def __init__(self, base=5.0, cap=600.0, factor=2.0):
+        """Создаёт задержку для первой попытки."""
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.attempt = 0
+
+    def next_delay(self):
+        """Возвращает случайную паузу перед следующей попыткой."""
+        ceiling = min(self.cap, self.base * self.factor ** self.attempt)
+        # Упёршись в cap, степень больше не растёт и не переполняется
+        if 0 < ceiling < self.cap:
+            self.attempt += 1
+        return random.uniform(0, ceiling)
+
+    def reset(self):
+        """Сбрасывает счётчик попыток после успеха."""
+        self.attempt = 0
+
+
+class CircuitBreaker:
+    """
+    Предохранитель closed/open/half-open вокруг вызовов внешнего сервиса.
+
+    После failure_threshold ошибок подряд вызовы сразу отклоняются
+    на recovery_timeout секунд, затем пропускается один пробный вызов:
+    при успехе предохранитель замыкается, при ошибке снова размыкается.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=60.0,
+                 clock=time.monotonic):
+        """Создаёт замкнутый предохранитель."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._state_gauge = REGISTRY.gauge(
+            'circuit_breaker_state',
+            'Состояние предохранителя: 0 — closed, 1 — open, 2 — half-open.',
+            labels={'name': name})
+        self._rejected = REGISTRY.counter(
+            'circuit_breaker_rejected_total',
+            'Вызовы, отклонённые разомкнутым предохранителем.',
+            labels={'name': name})
+
+    @property
+    def state(self):
+        """Текущее состояние предохранителя."""
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            logging.warning(
+                f'Предохранитель {self.name}: {self._state} -> {state}')
+        self._state = state
+        self._state_gauge.set(STATE_VALUES[state])
+
+    def before_call(self):
+        """Разрешает вызов или выбрасывает CircuitOpenError."""
+        with self._lock:
+            if (self._state == OPEN and self._clock() - self._opened_at
+                    >= self.recovery_timeout):
+                self._set_state(HALF_OPEN)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+        self._rejected.inc()
+        raise CircuitOpenError(
+            f'Сервис {self.name} временно недоступен, '
+            f'повторим попытку позже')
+
+    def on_success(self):
+        """Отмечает успешный вызов."""
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self._set_state(CLOSED)
+
+    def release(self):
+        """Отменяет разрешённый вызов, итог которого неизвестен."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def on_failure(self):
+        """Отмечает неудачный вызов и при необходимости размыкает цепь."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if (self._state == HALF_OPEN
+                    or self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._set_state(OPEN)
@@ -0,0 +1,18 @@
+"""
+Точка входа бота.
+
+Настройки и общие объекты живут в модуле homework, который импортируют
+и этот скрипт, и async_bot, поэтому в процессе они существуют
+в единственном экземпляре.
+"""
+import logging
+
+import homework
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+    homework.main()
@@ -0,0 +1,119 @@
+"""Адаптивный планировщик опроса API Практикума."""
+import asyncio
+import threading
+import time
+
+from metrics import REGISTRY
+
+POLL_INTERVAL = REGISTRY.gauge(
+    'poll_interval_seconds', 'Текущий интервал опроса API.')
+LOOP_LAG = REGISTRY.gauge(
+    'poll_loop_lag_seconds',
+    'Насколько последний опрос начался позже запланированного.')
+
+REVIEWING = 'reviewing'
+
+
+class AdaptivePollScheduler:
+    """
+    Вычисляет паузу до следующего опроса по статусам работ.
+
+    Пока хотя бы одна работа на ревью, опрос идёт с min_interval.
+    После idle_cycles опросов без изменений интервал растёт
+    в backoff_factor раз до max_interval. Любое изменение статуса
+    возвращает base_interval, нажатие /status — min_interval.
+    """
+
+    def __init__(self, min_interval=60, base_interval=600,
+                 max_interval=3600, backoff_factor=2.0, idle_cycles=3,
+                 clock=time.monotonic):
+        """Создаёт планировщик с базовым интервалом."""
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.idle_cycles = idle_cycles
+        self._clock = clock
+        self._interval = base_interval
+        self._idle = 0
+        self._reviewing = set()
+        self._last_poll = clock()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._loop = None
+        self._async_wakeup = None
+        POLL_INTERVAL.set(base_interval)
+
+    @property
+    def interval(self):
+        """Текущий интервал опроса в секундах."""
+        return self._interval
+
+    def _set_interval(self, interval):
+        self._interval = min(max(interval, self.min_interval),
+                             self.max_interval)
+        POLL_INTERVAL.set(self._interval)
+
+    def observe(self, homeworks):
+        """Пересчитывает интервал по работам из очередного ответа API."""
+        with self._lock:
+            for homework in homeworks:
+                key = homework.get('id', homework.get('homework_name'))
+                if homework.get('status') == REVIEWING:
+                    self._reviewing.add(key)
+                else:
+                    self._reviewing.discard(key)
+
+            if self._reviewing:
+                self._idle = 0
+                self._set_interval(self.min_interval)
+            elif homeworks:
+                self._idle = 0
+                self._set_interval(self.base_interval)
+            else:
+                self._idle += 1
+                if self._idle > self.idle_cycles:
+                    self._set_interval(self._interval * self.backoff_factor)
+
+    def reset(self):
+        """Сокращает интервал после запроса пользователя и будит опрос."""
+        with self._lock:
+            self._idle = 0
+            self._set_interval(self.min_interval)
+        self._wakeup.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_wakeup.set)
+
+    def _remaining(self, delay):
+        interval = self._interval if delay is None else delay
+        return self._last_poll + interval - self._clock()
+
+    def sleep(self, delay=None):
+        """
+        Блокирует поток до следующего опроса.
+
+        delay заменяет текущий интервал, например паузой после ошибки.
+        """
+        remaining = self._remaining(delay)
+        while remaining > 0:
+            self._wakeup.wait(remaining)
+            self._wakeup.clear()
+            remaining = self._remaining(delay)
+        LOOP_LAG.set(-remaining)
+        self._last_poll = self._clock()
+
+    async def async_sleep(self, delay=None):
+        """Ожидает следующего опроса, не блокируя цикл событий."""
+        if self._async_wakeup is None:
+            self._loop = asyncio.get_running_loop()
+            self._async_wakeup = asyncio.Event()
+        remaining = self._remaining(delay)
+        while remaining > 0:
+            try:
+                await asyncio.wait_for(self._async_wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            self._async_wakeup.clear()
+            remaining = self._remaining(delay)
+        LOOP_LAG.set(-remaining)
+        self._last_poll = self._clock()
@@ -0,0 +1,84 @@
+"""
+Объединение одинаковых одновременных запросов (single-flight).
+
+Пока запрос с некоторым ключом выполняется, остальные вызовы с тем же
+ключом не делают своих запросов, а ждут и получают его результат.
+"""
+import asyncio
+import threading
+
+from metrics import REGISTRY
+
+CALLS_COALESCED = REGISTRY.counter(
+    'singleflight_calls_coalesced_total',
+    'Вызовы, получившие результат уже выполняющегося запроса.')
+
+
+class _Call:
+    """Выполняющийся вызов и его результат."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Single-flight для потокового режима."""
+
+    def __init__(self):
+        """Создаёт пустую таблицу выполняющихся вызовов."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Выполняет func или дожидается уже идущего вызова с тем же key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            CALLS_COALESCED.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Single-flight для асинхронного режима."""
+
+    def __init__(self):
+        """Создаёт пустую таблицу выполняющихся задач."""
+        self._tasks = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """Выполняет корутину func или дожидается идущей с тем же key."""
+        task = self._tasks.get(key)
+        if task is not None:
+            CALLS_COALESCED.inc()
+        else:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # Отмена одного ожидающего не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+
+def coalesced_count():
+    """Возвращает число объединённых вызовов."""
+    return CALLS_COALESCED.value
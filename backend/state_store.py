@@ -0,0 +1,277 @@
+"""
+Постоянное хранилище состояния опроса в SQLite (режим WAL).
+
+Хранит курсор from_date и последний отправленный статус, последний
+увиденный статус каждой работы, исходящие уведомления и сообщения
+доски статусов. Записи
+копятся в памяти и сбрасываются в базу одной транзакцией фоновым
+потоком, поэтому цикл опроса не ждёт диска. Уведомления, которые
+Telegram окончательно отказался доставить, остаются в outbox
+с отметкой dead_at и текстом ошибки.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cursors ('
+    'owner TEXT PRIMARY KEY, '
+    'from_date INTEGER NOT NULL, '
+    'last_status TEXT)',
+    'CREATE TABLE IF NOT EXISTS homework_statuses ('
+    'owner TEXT NOT NULL, '
+    'homework TEXT NOT NULL, '
+    'status TEXT NOT NULL, '
+    'date_updated TEXT, '
+    'PRIMARY KEY (owner, homework))',
+    'CREATE TABLE IF NOT EXISTS outbox ('
+    'key TEXT PRIMARY KEY, '
+    'chat_id TEXT NOT NULL, '
+    'text TEXT NOT NULL, '
+    'created_at REAL NOT NULL, '
+    'delivered_at REAL, '
+    'dead_at REAL, '
+    'error TEXT)',
+    'CREATE TABLE IF NOT EXISTS boards ('
+    'chat_id TEXT PRIMARY KEY, '
+    'message_id INTEGER NOT NULL, '
+    'digest BLOB NOT NULL)',
+)
+
+# Столбцы, появившиеся после создания таблиц в старых базах
+COLUMNS = (
+    ('outbox', 'dead_at', 'REAL'),
+    ('outbox', 'error', 'TEXT'),
+)
+
+INDEXES = (
+    'DROP INDEX IF EXISTS outbox_pending',
+    'CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (chat_id, created_at) '
+    'WHERE delivered_at IS NULL AND dead_at IS NULL',
+)
+
+
+class StateStore:
+    """Хранилище курсоров, статусов работ и исходящих сообщений."""
+
+    def __init__(self, path, flush_interval=0.5, batch_size=500):
+        """Запоминает настройки; база открывается при первом обращении."""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._conn = None
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._cursors = {}
+        self._statuses = {}
+        self._outbox = {}
+        self._delivered = {}
+        self._dead = {}
+        self._boards = {}
+        self._wakeup = threading.Event()
+        self._writer = None
+
+    def _connection(self):
+        """Открывает базу и запускает фоновую запись; под _db_lock."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for table, column, kind in COLUMNS:
+                existing = {row[1] for row in conn.execute(
+                    f'PRAGMA table_info({table})')}
+                if column not in existing:
+                    conn.execute(
+                        f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+            for statement in INDEXES:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+            self._writer = threading.Thread(
+                target=self._write_loop, name='state-writer', daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+        return self._conn
+
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _queued(self):
+        return (len(self._cursors) + len(self._statuses)
+                + len(self._outbox) + len(self._delivered)
+                + len(self._dead) + len(self._boards))
+
+    def _schedule(self):
+        """Будит запись раньше срока, если накопилась целая пачка."""
+        if self._queued() >= self.batch_size:
+            self._wakeup.set()
+        elif self._writer is None:
+            with self._db_lock:
+                self._connection()
+
+    def get_cursor(self, owner):
+        """Возвращает (from_date, last_status) или None."""
+        with self._lock:
+            if owner in self._cursors:
+                return self._cursors[owner]
+        rows = self._query(
+            'SELECT from_date, last_status FROM cursors WHERE owner = ?',
+            (owner,))
+        return tuple(rows[0]) if rows else None
+
+    def set_cursor(self, owner, from_date, last_status):
+        """Сохраняет курсор опроса и последний отправленный статус."""
+        with self._lock:
+            self._cursors[owner] = (from_date, last_status)
+        self._schedule()
+
+    def get_statuses(self, owner):
+        """Возвращает {работа: (статус, date_updated)} для владельца."""
+        rows = self._query(
+            'SELECT homework, status, date_updated FROM homework_statuses '
+            'WHERE owner = ?', (owner,))
+        statuses = {homework: (status, updated)
+                    for homework, status, updated in rows}
+        with self._lock:
+            for (pending_owner, homework), value in self._statuses.items():
+                if pending_owner == owner:
+                    statuses[homework] = value
+        return statuses
+
+    def set_status(self, owner, homework, status, date_updated=None):
+        """Сохраняет последний увиденный статус работы."""
+        with self._lock:
+            self._statuses[(owner, homework)] = (
+                status, None if date_updated is None else str(date_updated))
+        self._schedule()
+
+    def add_outbox(self, key, chat_id, text):
+        """Ставит уведомление в исходящие; повтор ключа игнорируется."""
+        with self._lock:
+            self._outbox.setdefault(key, (str(chat_id), text, time.time()))
+        self._schedule()
+
+    def mark_delivered(self, key):
+        """Отмечает уведомление доставленным."""
+        with self._lock:
+            self._delivered[key] = time.time()
+        self._schedule()
+
+    def mark_dead(self, key, error):
+        """Отмечает уведомление, которое доставить невозможно."""
+        with self._lock:
+            self._dead[key] = (time.time(), error)
+        self._schedule()
+
+    def pending_outbox(self, limit=100, per_chat=None, exclude=()):
+        """
+        Возвращает недоставленные уведомления, старые первыми.
+
+        Каждое — (ключ, чат, текст, время создания). От одного чата
+        берётся не больше per_chat самых старых, чаты из exclude
+        пропускаются, поэтому накопившиеся уведомления одного чата
+        не вытесняют остальные.
+        """
+        self.flush()
+        exclude = [str(chat_id) for chat_id in exclude]
+        placeholders = ', '.join('?' * len(exclude))
+        rows = self._query(
+            'SELECT key, chat_id, text, created_at FROM ('
+            'SELECT key, chat_id, text, created_at, ROW_NUMBER() OVER ('
+            'PARTITION BY chat_id ORDER BY created_at) AS position '
+            'FROM outbox WHERE delivered_at IS NULL AND dead_at IS NULL '
+            f'AND chat_id NOT IN ({placeholders})'
+            ') WHERE position <= ? ORDER BY created_at LIMIT ?',
+            (*exclude, per_chat or limit, limit))
+        return [tuple(row) for row in rows]
+
+    def get_board(self, chat_id):
+        """Возвращает (message_id, хэш текста) доски чата или None."""
+        chat_id = str(chat_id)
+        with self._lock:
+            if chat_id in self._boards:
+                return self._boards[chat_id]
+        rows = self._query(
+            'SELECT message_id, digest FROM boards WHERE chat_id = ?',
+            (chat_id,))
+        return (rows[0][0], bytes(rows[0][1])) if rows else None
+
+    def set_board(self, chat_id, message_id, digest):
+        """Сохраняет сообщение доски чата и хэш его текста."""
+        with self._lock:
+            self._boards[str(chat_id)] = (message_id, digest)
+        self._schedule()
+
+    def flush(self):
+        """Записывает все накопленные изменения одной транзакцией."""
+        with self._lock:
+            cursors, self._cursors = self._cursors, {}
+            statuses, self._statuses = self._statuses, {}
+            outbox, self._outbox = self._outbox, {}
+            delivered, self._delivered = self._delivered, {}
+            dead, self._dead = self._dead, {}
+            boards, self._boards = self._boards, {}
+        if not (cursors or statuses or outbox or delivered or dead
+                or boards):
+            return
+        with self._db_lock:
+            conn = self._connection()
+            try:
+                with conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO cursors '
+                        '(owner, from_date, last_status) VALUES (?, ?, ?)',
+                        [(owner, *value) for owner, value in cursors.items()])
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO homework_statuses '
+                        '(owner, homework, status, date_updated) '
+                        'VALUES (?, ?, ?, ?)',
+                        [(*key, *value) for key, value in statuses.items()])
+                    conn.executemany(
+                        'INSERT OR IGNORE INTO outbox '
+                        '(key, chat_id, text, created_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        [(key, *value) for key, value in outbox.items()])
+                    conn.executemany(
+                        'UPDATE outbox SET delivered_at = ? WHERE key = ?',
+                        [(at, key) for key, at in delivered.items()])
+                    conn.executemany(
+                        'UPDATE outbox SET dead_at = ?, error = ? '
+                        'WHERE key = ?',
+                        [(*value, key) for key, value in dead.items()])
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO boards '
+                        '(chat_id, message_id, digest) VALUES (?, ?, ?)',
+                        [(chat_id, *value)
+                         for chat_id, value in boards.items()])
+            except sqlite3.Error as error:
+                logging.error(f'Не удалось сохранить состояние: {error}')
+                self._requeue(
+                    cursors, statuses, outbox, delivered, dead, boards)
+
+    def _requeue(self, cursors, statuses, outbox, delivered, dead, boards):
+        """Возвращает несохранённые изменения в очередь, не затирая новые."""
+        with self._lock:
+            for pending, failed in ((self._cursors, cursors),
+                                    (self._statuses, statuses),
+                                    (self._outbox, outbox),
+                                    (self._delivered, delivered),
+                                    (self._dead, dead),
+                                    (self._boards, boards)):
+                for key, value in failed.items():
+                    pending.setdefault(key, value)
+
+    def _write_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
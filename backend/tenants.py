@@ -0,0 +1,205 @@
+"""
+Многопользовательский режим бота.
+
+Каждый студент регистрирует свой токен Практикума командой /register.
+Токены и курсоры опроса хранятся в SQLite, а один общий планировщик
+опрашивает API для всех студентов фиксированным пулом потоков.
+"""
+import heapq
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import REGISTRY
+
+TENANTS_ACTIVE = REGISTRY.gauge(
+    'tenants_scheduled', 'Студенты, стоящие в расписании опроса.')
+TENANT_POLLS = REGISTRY.counter(
+    'tenant_polls_total', 'Выполненные опросы API для студентов.')
+TENANT_LAG = REGISTRY.gauge(
+    'tenant_poll_lag_seconds',
+    'Насколько последний опрос студента начался позже запланированного.')
+
+Tenant = namedtuple('Tenant', 'chat_id token cursor last_status')
+
+
+class TenantStore:
+    """Хранилище токенов и состояния опроса студентов в SQLite."""
+
+    def __init__(self, path):
+        """Открывает базу, создавая каталог и таблицу при необходимости."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS tenants ('
+                'chat_id INTEGER PRIMARY KEY, '
+                'token TEXT NOT NULL, '
+                'cursor INTEGER NOT NULL, '
+                'last_status TEXT)'
+            )
+
+    def register(self, chat_id, token, cursor):
+        """Сохраняет токен студента и начальный курсор опроса."""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO tenants '
+                '(chat_id, token, cursor, last_status) '
+                'VALUES (?, ?, ?, NULL)',
+                (chat_id, token, cursor)
+            )
+
+    def unregister(self, chat_id):
+        """Удаляет студента; возвращает False, если его не было."""
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM tenants WHERE chat_id = ?', (chat_id,))
+        return cursor.rowcount > 0
+
+    def get(self, chat_id):
+        """Возвращает студента по чату или None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT chat_id, token, cursor, last_status '
+                'FROM tenants WHERE chat_id = ?', (chat_id,)
+            ).fetchone()
+        return Tenant(*row) if row else None
+
+    def count(self):
+        """Возвращает число зарегистрированных студентов."""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM tenants').fetchone()[0]
+
+    def update_state(self, chat_id, cursor, last_status):
+        """Сохраняет курсор и последний статус после уведомления."""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE tenants SET cursor = ?, last_status = ? '
+                'WHERE chat_id = ?',
+                (cursor, last_status, chat_id)
+            )
+
+    def chat_ids(self, batch_size=1000):
+        """Постранично перебирает чаты всех студентов."""
+        last_id = None
+        while True:
+            with self._lock:
+                if last_id is None:
+                    rows = self._conn.execute(
+                        'SELECT chat_id FROM tenants ORDER BY chat_id '
+                        'LIMIT ?', (batch_size,)).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        'SELECT chat_id FROM tenants WHERE chat_id > ? '
+                        'ORDER BY chat_id LIMIT ?',
+                        (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for (chat_id,) in rows:
+                yield chat_id
+            last_id = rows[-1][0]
+
+
+class TenantPoller:
+    """
+    Общий планировщик опроса API для всех студентов.
+
+    В памяти хранится только куча (время опроса, чат); сам опрос
+    выполняет пул из workers потоков, поэтому число потоков
+    и соединений не зависит от числа студентов.
+    """
+
+    def __init__(self, store, poll_tenant, interval=600, workers=8):
+        """
+        Создаёт планировщик; poll_tenant(tenant) опрашивает одного.
+
+        Если poll_tenant вернул Future, следующий опрос студента
+        отсчитывается от её завершения, а поток пула освобождается сразу.
+        """
+        self.store = store
+        self.interval = interval
+        self._poll_tenant = poll_tenant
+        self._heap = []
+        self._scheduled = set()
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='tenant-poll')
+
+    def add(self, chat_id, delay=0):
+        """Ставит студента в расписание, если его там ещё нет."""
+        with self._cond:
+            if chat_id in self._scheduled:
+                return
+            self._scheduled.add(chat_id)
+            heapq.heappush(self._heap, (time.monotonic() + delay, chat_id))
+            TENANTS_ACTIVE.set(len(self._scheduled))
+            self._cond.notify()
+
+    def _poll(self, chat_id):
+        registered = True
+        try:
+            tenant = self.store.get(chat_id)
+            registered = tenant is not None
+            if registered:
+                pending = self._poll_tenant(tenant)
+                if isinstance(pending, Future):
+                    # Пока задание в работе, студент не стоит в расписании,
+                    # поэтому его опросы не накладываются друг на друга
+                    pending.add_done_callback(
+                        lambda future: self._polled(chat_id))
+                    return
+                TENANT_POLLS.inc()
+        except Exception as error:
+            logging.error(f'Ошибка опроса для чата {chat_id}: {error}')
+        finally:
+            self._slots.release()
+        self._reschedule(chat_id, registered)
+
+    def _polled(self, chat_id):
+        TENANT_POLLS.inc()
+        self._reschedule(chat_id, True)
+
+    def _reschedule(self, chat_id, registered):
+        with self._cond:
+            if registered:
+                heapq.heappush(
+                    self._heap, (time.monotonic() + self.interval, chat_id))
+                self._cond.notify()
+            else:
+                # Отписавшиеся студенты просто выпадают из расписания
+                self._scheduled.discard(chat_id)
+                TENANTS_ACTIVE.set(len(self._scheduled))
+
+    def run(self):
+        """Загружает всех студентов и бесконечно раздаёт опросы пулу."""
+        for chat_id in self.store.chat_ids():
+            # Размазываем первые опросы по интервалу, чтобы не было всплеска
+            self.add(chat_id, random.uniform(0, self.interval))
+
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due, chat_id = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+            # Не берём новых студентов, пока все потоки пула заняты
+            self._slots.acquire()
+            TENANT_LAG.set(time.monotonic() - due)
+            self._executor.submit(self._poll, chat_id)
@@ -0,0 +1,40 @@
+"""Общие фикстуры тестов."""
+import time
+
+import pytest
+
+from state_store import StateStore
+
+
+class FakeClock:
+    """Часы, которые идут только по команде теста."""
+
+    def __init__(self, now=None):
+        """Запускает часы с текущего времени или с now."""
+        self.now = time.time() if now is None else now
+
+    def __call__(self):
+        """Возвращает текущее время часов."""
+        return self.now
+
+    def advance(self, seconds):
+        """Переводит часы вперёд."""
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Управляемые часы, начатые с настоящего времени."""
+    return FakeClock()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Путь к базе состояния во временном каталоге."""
+    return str(tmp_path / 'state.sqlite3')
+
+
+@pytest.fixture
+def store(db_path):
+    """Хранилище состояния во временном каталоге."""
+    return StateStore(db_path)
@@ -0,0 +1,120 @@
+"""Отправка сообщений в асинхронном режиме."""
+import asyncio
+
+import pytest
+
+from telebot import asyncio_helper
+
+import async_bot
+from exceptions import CircuitOpenError
+from outbound import AsyncOutboundQueue
+from outbox import OutboxDrainer
+from resilience import HALF_OPEN, OPEN, CircuitBreaker
+
+
+def telegram_error(error_code, **parameters):
+    """Создаёт ошибку AsyncTeleBot с кодом ответа Telegram."""
+    return asyncio_helper.ApiTelegramException('sendMessage', None, {
+        'error_code': error_code,
+        'description': 'error',
+        'parameters': parameters,
+    })
+
+
+@pytest.fixture
+def send_errors(monkeypatch):
+    """Ошибки, которые по очереди выбросит bot.send_message."""
+    errors = []
+
+    async def send_message(chat_id, text, **kwargs):
+        if errors:
+            raise errors.pop(0)
+
+    monkeypatch.setattr(async_bot.bot, 'send_message', send_message)
+    return errors
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    """Предохранитель Telegram на две ошибки с паузой 60 секунд."""
+    breaker = CircuitBreaker(
+        'telegram_test', failure_threshold=2, recovery_timeout=60,
+        clock=clock)
+    monkeypatch.setattr(async_bot, 'telegram_breaker', breaker)
+    return breaker
+
+
+def open_breaker(breaker, clock):
+    """Размыкает предохранитель и дожидается пробного вызова."""
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.advance(60)
+
+
+def test_request_timeout_fails_probe(breaker, clock, send_errors):
+    """Сетевой сбой во время пробы снова размыкает цепь."""
+    open_breaker(breaker, clock)
+    send_errors.append(asyncio_helper.RequestTimeout('timeout'))
+
+    with pytest.raises(asyncio_helper.RequestTimeout):
+        asyncio.run(async_bot.deliver_message('1', 'текст'))
+
+    assert breaker.state == OPEN
+    clock.advance(60)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def test_too_many_requests_is_not_failure(breaker, send_errors):
+    """Ответ 429 не считается сбоем Telegram."""
+    send_errors.extend([telegram_error(429, retry_after=1)] * 2)
+
+    for _ in range(2):
+        with pytest.raises(asyncio_helper.ApiTelegramException):
+            asyncio.run(async_bot.deliver_message('1', 'текст'))
+
+    breaker.before_call()
+
+
+def test_cancelled_probe_is_released(breaker, clock, monkeypatch):
+    """Отменённая во время пробы отправка освобождает пробу."""
+    open_breaker(breaker, clock)
+
+    async def send_message(chat_id, text, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(async_bot.bot, 'send_message', send_message)
+
+    async def cancel_send():
+        task = asyncio.create_task(async_bot.deliver_message('1', 'текст'))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_send())
+
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_request_timeout_does_not_block_chat(
+        monkeypatch, store, clock, breaker, send_errors):
+    """После сетевого сбоя уведомления чата снова отправляются."""
+    drainer = OutboxDrainer(store, None, backoff_base=10, clock=clock)
+    monkeypatch.setattr(async_bot, 'outbox_drainer', drainer)
+    monkeypatch.setattr(async_bot, 'outbound_queue', AsyncOutboundQueue(
+        async_bot.deliver_message, global_rate=1000, chat_rate=1000))
+    store.add_outbox('1:hw:approved:x', '1', 'Принято')
+    send_errors.append(asyncio_helper.RequestTimeout('timeout'))
+    clock.advance(1)
+    (message,), _ = drainer.batch()
+    drainer.begin(message)
+
+    asyncio.run(async_bot.deliver_outbox_message(message, asyncio.Event()))
+
+    assert drainer.stats() == {'1': (0, 1)}
+    clock.advance(11)
+    assert drainer.batch()[0] == [message]
@@ -0,0 +1,139 @@
+"""Доска статусов в закреплённом сообщении."""
+from types import SimpleNamespace
+
+import pytest
+
+from telebot import apihelper
+
+from board import StatusBoard
+
+
+def telegram_error(description, error_code=400):
+    """Создаёт ошибку TeleBot с описанием из ответа Telegram."""
+    return apihelper.ApiTelegramException('editMessageText', None, {
+        'error_code': error_code, 'description': description})
+
+
+class FakeBot:
+    """Бот, запоминающий вызовы доски."""
+
+    def __init__(self):
+        """Создаёт бота без отправленных сообщений."""
+        self.calls = []
+        self.edit_errors = []
+        self.next_id = 1
+
+    def send_message(self, chat_id, text):
+        """Отправляет сообщение с новым id."""
+        self.calls.append(('send', chat_id, text))
+        message = SimpleNamespace(message_id=self.next_id)
+        self.next_id += 1
+        return message
+
+    def edit_message_text(self, text, chat_id, message_id):
+        """Правит сообщение или выбрасывает очередную ошибку."""
+        self.calls.append(('edit', message_id, text))
+        if self.edit_errors:
+            raise self.edit_errors.pop(0)
+
+    def pin_chat_message(self, chat_id, message_id, disable_notification):
+        """Закрепляет сообщение."""
+        self.calls.append(('pin', message_id))
+
+
+@pytest.fixture
+def bot():
+    """Поддельный бот."""
+    return FakeBot()
+
+
+@pytest.fixture
+def board(store, bot):
+    """Доска статусов поверх временного хранилища."""
+    return StatusBoard(store, bot)
+
+
+def test_first_show_sends_and_pins(board, bot, store):
+    """Первое обновление отправляет и закрепляет сообщение."""
+    board.show(1, 'на ревью')
+
+    assert bot.calls == [('send', 1, 'на ревью'), ('pin', 1)]
+    assert store.get_board(1)[0] == 1
+
+
+def test_changed_text_is_edited_in_place(board, bot, store):
+    """Новый текст правит то же сообщение."""
+    board.show(1, 'на ревью')
+    bot.calls.clear()
+
+    board.show(1, 'принята')
+
+    assert bot.calls == [('edit', 1, 'принята')]
+    assert store.get_board(1)[0] == 1
+
+
+def test_unchanged_text_is_skipped(board, bot):
+    """Тот же текст не отправляется, пока его не просят проверить."""
+    board.show(1, 'на ревью')
+    bot.calls.clear()
+
+    board.show(1, 'на ревью')
+    assert bot.calls == []
+
+    board.show(1, 'на ревью', force=True)
+    assert bot.calls == [('edit', 1, 'на ревью')]
+
+
+def test_not_modified_counts_as_edited(board, bot, store):
+    """Ответ «не изменено» не создаёт новую доску."""
+    board.show(1, 'на ревью')
+    bot.calls.clear()
+    bot.edit_errors.append(telegram_error(
+        'Bad Request: message is not modified'))
+
+    board.show(1, 'на ревью', force=True)
+
+    assert bot.calls == [('edit', 1, 'на ревью')]
+    assert store.get_board(1)[0] == 1
+
+
+def test_deleted_board_is_recreated(board, bot, store):
+    """Если сообщение удалили, отправляется и закрепляется новое."""
+    board.show(1, 'на ревью')
+    bot.calls.clear()
+    bot.edit_errors.append(telegram_error(
+        'Bad Request: message to edit not found'))
+
+    board.show(1, 'принята')
+
+    assert bot.calls == [
+        ('edit', 1, 'принята'), ('send', 1, 'принята'), ('pin', 2)]
+    assert store.get_board(1)[0] == 2
+
+
+def test_other_edit_errors_propagate(board, bot, store):
+    """Прочие ошибки уходят в очередь отправки, доска не меняется."""
+    board.show(1, 'на ревью')
+    old = store.get_board(1)
+    bot.edit_errors.append(telegram_error('Bad Gateway', error_code=502))
+
+    with pytest.raises(apihelper.ApiTelegramException):
+        board.show(1, 'принята')
+
+    assert store.get_board(1) == old
+
+
+def test_api_calls_go_through_call(store, bot):
+    """Каждый вызов Telegram API проходит через call."""
+    called = []
+
+    def call(func, *args, **kwargs):
+        called.append(func.__name__)
+        return func(*args, **kwargs)
+
+    board = StatusBoard(store, bot, call=call)
+    board.show(1, 'на ревью')
+    board.show(1, 'принята')
+
+    assert called == [
+        'send_message', 'pin_chat_message', 'edit_message_text']
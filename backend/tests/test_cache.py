@@ -0,0 +1,66 @@
+"""Кэш ответов API с TTL и stale-while-revalidate."""
+import pytest
+
+from cache import ResponseCache
+
+ANSWER = {'homeworks': [], 'current_date': 0}
+
+
+@pytest.fixture
+def cache(clock):
+    """Кэш: свежий 60 секунд, устаревший ещё 600, окна по минуте."""
+    return ResponseCache(ttl=60, stale_ttl=600, window=60, clock=clock)
+
+
+def test_miss_without_entry(cache):
+    """Пустой кэш не находит ответа."""
+    assert cache.get('token', 1200) is None
+
+
+def test_fresh_entry_is_served(cache, clock):
+    """До ttl ответ отдаётся как свежий."""
+    cache.put('token', 1200, ANSWER)
+    clock.advance(59)
+
+    assert cache.get('token', 1210) == (ANSWER, False)
+
+
+def test_stale_entry_is_served_for_refresh(cache, clock):
+    """После ttl ответ отдаётся с признаком устаревания."""
+    cache.put('token', 1200, ANSWER)
+    clock.advance(60)
+
+    assert cache.get('token', 1200) == (ANSWER, True)
+
+
+def test_expired_entry_is_a_miss(cache, clock):
+    """После ttl + stale_ttl ответа больше нет."""
+    cache.put('token', 1200, ANSWER)
+    clock.advance(660)
+
+    assert cache.get('token', 1200) is None
+
+
+def test_earlier_window_covers_later_request(cache):
+    """Ответ с более ранним from_date покрывает более позднее окно."""
+    cache.put('token', 0, ANSWER)
+
+    assert cache.get('token', 3600) == (ANSWER, False)
+    assert cache.get('other', 3600) is None
+
+
+def test_later_window_does_not_cover_earlier_request(cache):
+    """Ответ за более позднее окно не подходит для раннего from_date."""
+    cache.put('token', 3600, ANSWER)
+
+    assert cache.get('token', 0) is None
+
+
+def test_one_refresh_at_a_time(cache):
+    """Фоновое обновление окна запускается один раз до его окончания."""
+    assert cache.begin_refresh('token', 1200)
+    assert not cache.begin_refresh('token', 1210)
+
+    cache.end_refresh('token', 1200)
+
+    assert cache.begin_refresh('token', 1200)
@@ -0,0 +1,112 @@
+"""Быстрый путь для неизменившихся ответов API."""
+import json
+
+import pytest
+
+import homework
+from conditional import FULL_PARSES, ConditionalCache, fingerprint
+
+KEY = ('token', 0)
+HOMEWORKS = [{'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'}]
+
+
+def body(current_date, homeworks=HOMEWORKS):
+    """Возвращает тело ответа API."""
+    return json.dumps(
+        {'homeworks': homeworks, 'current_date': current_date}).encode()
+
+
+def test_fingerprint_ignores_current_date():
+    """Ответы, различающиеся только current_date, совпадают."""
+    assert fingerprint(body(100)) == fingerprint(body(200))
+
+
+def test_fingerprint_sees_status_change():
+    """Изменение статуса меняет хэш."""
+    changed = [dict(HOMEWORKS[0], status='rejected')]
+
+    assert fingerprint(body(100)) != fingerprint(body(100, changed))
+
+
+def test_match_only_after_commit():
+    """Ответ становится образцом только после commit()."""
+    cache = ConditionalCache()
+    digest = fingerprint(body(100))
+    cache.remember(KEY, {}, digest, 'ответ')
+
+    assert cache.match(KEY, digest) is None
+
+    cache.commit(KEY)
+    assert cache.match(KEY, fingerprint(body(200))) == 'ответ'
+
+
+def test_commit_without_pending_keeps_entry():
+    """Повторный commit() не стирает подтверждённый ответ."""
+    cache = ConditionalCache()
+    digest = fingerprint(body(100))
+    cache.remember(KEY, {}, digest, 'ответ')
+    cache.commit(KEY)
+
+    cache.commit(KEY)
+
+    assert cache.match(KEY, digest) == 'ответ'
+
+
+def test_validators_become_request_headers():
+    """Валидаторы подтверждённого ответа уходят в условный запрос."""
+    cache = ConditionalCache()
+    cache.remember(KEY, {'ETag': '"v1"', 'Last-Modified': 'Mon'}, b'', 'ответ')
+    assert cache.request_headers(KEY) == {}
+
+    cache.commit(KEY)
+
+    assert cache.request_headers(KEY) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'}
+    assert cache.not_modified(KEY) == 'ответ'
+
+
+class FakeResponse:
+    """Ответ API Практикума без валидаторов."""
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, content):
+        """Запоминает тело ответа."""
+        self.content = content
+
+    def json(self):
+        """Разбирает тело ответа."""
+        return json.loads(self.content)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Отдаёт одно и то же тело на каждый запрос к API."""
+    monkeypatch.setattr(
+        homework.practicum_session, 'get',
+        lambda *args, **kwargs: FakeResponse(body(100)))
+    monkeypatch.setattr(homework, 'conditional_cache', ConditionalCache())
+    return homework.conditional_cache
+
+
+def test_interactive_fetch_is_not_staged(api):
+    """Запрос по кнопке не ждёт commit() и не считается разбором опроса."""
+    parses = FULL_PARSES.value
+
+    answer, changed = homework.fetch_api_answer(
+        0, 'token', homework.INTERACTIVE)
+
+    assert changed and answer['homeworks'] == HOMEWORKS
+    assert not api._pending
+    assert FULL_PARSES.value == parses
+
+
+def test_poll_fetch_is_staged(api):
+    """Ответ опроса ждёт commit(), после него совпадает по хэшу."""
+    homework.fetch_api_answer(0, 'token', poll=True)
+    assert KEY in api._pending
+
+    api.commit(KEY)
+
+    assert homework.fetch_api_answer(0, 'token', poll=True)[1] is False
@@ -0,0 +1,86 @@
+"""Маршрутизация сообщений по таблицам диспетчера."""
+from types import SimpleNamespace
+
+import pytest
+
+from dispatch import Dispatcher
+
+
+def message(text=None, content_type='text'):
+    """Создаёт сообщение с нужными диспетчеру полями."""
+    return SimpleNamespace(text=text, content_type=content_type)
+
+
+def status(message):
+    """Обработчик /status."""
+
+
+def button(message):
+    """Обработчик кнопки."""
+
+
+def keyboard(message):
+    """Обработчик прочего текста."""
+
+
+def photo(message):
+    """Обработчик фотографий."""
+
+
+@pytest.fixture
+def dispatcher():
+    """Диспетчер с командой, кнопкой, типом сообщения и запасным."""
+    dispatcher = Dispatcher()
+    dispatcher.command('status')(status)
+    dispatcher.text('Проверить статус')(button)
+    dispatcher.content_type('photo')(photo)
+    dispatcher.fallback(keyboard)
+    return dispatcher
+
+
+@pytest.mark.parametrize('text', [
+    '/status', '/STATUS', '/status@homework_bot', '/status сейчас'])
+def test_command_is_routed(dispatcher, text):
+    """Команда находится без учёта регистра, имени бота и аргументов."""
+    assert dispatcher.route(message(text)) is status
+
+
+@pytest.mark.parametrize('text', [
+    'Проверить статус', '  проверить   СТАТУС '])
+def test_button_text_is_normalized(dispatcher, text):
+    """Подпись кнопки находится без учёта пробелов и регистра."""
+    assert dispatcher.route(message(text)) is button
+
+
+@pytest.mark.parametrize('text', [
+    '/unknown', 'привет', '', None, '/', '/ ', '/\n', '/\xa0'])
+def test_other_text_falls_back(dispatcher, text):
+    """Неизвестные команды и прочий текст уходят запасному обработчику."""
+    assert dispatcher.route(message(text)) is keyboard
+
+
+def test_long_text_is_not_matched(dispatcher):
+    """Текст длиннее любой подписи сразу уходит запасному обработчику."""
+    text = 'Проверить статус' + ' ' * 100
+
+    assert dispatcher.route(message(text)) is keyboard
+
+
+def test_content_type_is_routed(dispatcher):
+    """Сообщения других типов находятся по content_type."""
+    assert dispatcher.route(message(content_type='photo')) is photo
+    assert dispatcher.route(message(content_type='sticker')) is None
+    assert dispatcher.content_types() == ['text', 'photo']
+
+
+def test_dispatch_uses_runner():
+    """dispatch() передаёт обработчик и сообщение в run."""
+    calls = []
+    dispatcher = Dispatcher(run=lambda *call: calls.append(call))
+    dispatcher.command('status')(status)
+    incoming = message('/status')
+
+    dispatcher.dispatch(incoming)
+    dispatcher.dispatch(message('привет'))
+
+    assert calls == [(status, incoming)]
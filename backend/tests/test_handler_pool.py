@@ -0,0 +1,90 @@
+"""Пулы обработчиков сообщений."""
+import threading
+import time
+
+from types import SimpleNamespace
+
+import handler_pool
+from handler_pool import HandlerExecutor
+
+MESSAGE = SimpleNamespace(chat=SimpleNamespace(id=1))
+
+
+def wait_for(condition):
+    """Ждёт, пока потоки пула не выполнят условие."""
+    while not condition():
+        time.sleep(0.001)
+
+
+def test_handlers_run_in_their_pools():
+    """Дорогие обработчики выполняются отдельно от дешёвых."""
+    executor = HandlerExecutor(cheap_workers=1, expensive_workers=1)
+    pools = {}
+    done = threading.Barrier(3)
+
+    def routing_cheap(message):
+        pools['cheap'] = threading.current_thread().name
+        done.wait()
+
+    @executor.expensive
+    def routing_expensive(message):
+        pools['expensive'] = threading.current_thread().name
+        done.wait()
+
+    executor.submit(routing_cheap, MESSAGE)
+    executor.submit(routing_expensive, MESSAGE)
+    done.wait()
+
+    assert pools['cheap'].startswith('handlers-cheap-')
+    assert pools['expensive'].startswith('handlers-expensive-')
+
+
+def test_full_pool_sheds_messages():
+    """Сообщение сверх очереди отбрасывается, другой пул не страдает."""
+    executor = HandlerExecutor(
+        cheap_workers=1, expensive_workers=1, queue_size=1)
+    started = threading.Event()
+    release = threading.Event()
+    handled = []
+
+    def shed_slow(message):
+        started.set()
+        release.wait()
+        handled.append(message)
+
+    @executor.expensive
+    def shed_other(message):
+        handled.append('other')
+
+    shed = executor._pools['cheap']._shed
+    before = shed.value
+    executor.submit(shed_slow, 'first')
+    started.wait()
+    executor.submit(shed_slow, 'queued')
+    executor.submit(shed_slow, MESSAGE)
+    executor.submit(shed_other, MESSAGE)
+
+    assert shed.value == before + 1
+    wait_for(lambda: handled == ['other'])
+    release.set()
+    wait_for(lambda: len(handled) == 3)
+    assert handled == ['other', 'first', 'queued']
+
+
+def test_latency_quantiles(clock, monkeypatch):
+    """Квантили задержки считаются по наблюдениям обработчика."""
+    monkeypatch.setattr(
+        handler_pool, 'time', SimpleNamespace(monotonic=clock))
+    executor = HandlerExecutor(cheap_workers=1)
+
+    def quantile_handler(message):
+        clock.advance(message)
+
+    summary = executor._summary(quantile_handler)
+    # По одному сообщению: задержка каждого равна его времени обработки
+    for count, delay in enumerate(range(1, 101), start=1):
+        executor.submit(quantile_handler, delay)
+        wait_for(lambda: summary.snapshot()[2] == count)
+
+    assert executor.latency()['quantile_handler'] == {
+        0.5: 51, 0.95: 96, 0.99: 100}
@@ -0,0 +1,88 @@
+"""Изменения статусов и индекс домашних работ."""
+from homeworks import HomeworkDiff, HomeworkIndex
+
+
+def homework(status, date_updated, homework_id=1, name='hw.zip'):
+    """Создаёт работу в формате ответа API."""
+    return {'id': homework_id, 'homework_name': name,
+            'status': status, 'date_updated': date_updated}
+
+
+def test_new_homework_is_a_change():
+    """Работа, которой не было в снимке, даёт изменение без старого статуса."""
+    changes = HomeworkDiff().diff([homework('reviewing', '2024-01-01T10:00')])
+
+    assert [(change.old_status, change.new_status) for change in changes] == [
+        (None, 'reviewing')]
+
+
+def test_unchanged_homework_is_skipped():
+    """Работа с тем же статусом и date_updated не даёт изменений."""
+    homework_diff = HomeworkDiff({'1': ('approved', '2024-01-01T10:00')})
+
+    assert homework_diff.diff([homework('approved', '2024-01-01T10:00')]) == []
+
+
+def test_rejected_reviewing_rejected_is_not_lost():
+    """Возврат к прежнему статусу между опросами тоже изменение."""
+    homework_diff = HomeworkDiff({'1': ('rejected', '2024-01-01T10:00')})
+
+    changes = homework_diff.diff([homework('rejected', '2024-01-03T10:00')])
+
+    assert len(changes) == 1
+    assert changes[0].old_status == 'rejected'
+    assert changes[0].new_status == 'rejected'
+    assert changes[0].date_updated == '2024-01-03T10:00'
+
+
+def test_every_homework_is_diffed():
+    """Изменения находятся у всех работ ответа, а не только у последней."""
+    homework_diff = HomeworkDiff({
+        '1': ('reviewing', '2024-01-01T10:00'),
+        '2': ('reviewing', '2024-01-01T11:00'),
+    })
+
+    changes = homework_diff.diff([
+        homework('approved', '2024-01-02T10:00', 1, 'first.zip'),
+        homework('reviewing', '2024-01-01T11:00', 2, 'second.zip'),
+        homework('reviewing', '2024-01-02T12:00', 3, 'third.zip'),
+    ])
+
+    assert [change.homework_name for change in changes] == [
+        'first.zip', 'third.zip']
+
+
+def test_change_is_repeated_until_committed():
+    """Снимок обновляется только после commit()."""
+    homework_diff = HomeworkDiff()
+    response = [homework('approved', '2024-01-01T10:00')]
+
+    change, = homework_diff.diff(response)
+    assert homework_diff.diff(response) == [change]
+
+    homework_diff.commit(change)
+    assert homework_diff.diff(response) == []
+
+
+def test_index_finds_homework_by_id_and_name():
+    """Работа находится по id и по названию."""
+    index = HomeworkIndex()
+    index.update([
+        homework('approved', '2024-01-01T10:00', 1, 'first.zip'),
+        homework('reviewing', '2024-01-02T10:00', 2, 'second.zip'),
+    ])
+
+    assert index.get(1)['homework_name'] == 'first.zip'
+    assert index.get('second.zip')['status'] == 'reviewing'
+    assert index.get('missing.zip') is None
+    assert index.latest()['homework_name'] == 'second.zip'
+
+
+def test_index_follows_updated_homework():
+    """Обновлённая работа находится с новым статусом."""
+    index = HomeworkIndex()
+    index.update([homework('reviewing', '2024-01-01T10:00')])
+    index.update([homework('approved', '2024-01-02T10:00')])
+
+    assert index.get('hw.zip')['status'] == 'approved'
+    assert len(index.changed_since(0)) == 1
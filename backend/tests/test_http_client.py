@@ -0,0 +1,69 @@
+"""Пул keep-alive соединений общего HTTP-клиента."""
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import PooledSession, connection_stats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Отвечает на GET, не закрывая соединение."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        """Отдаёт пустой JSON."""
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Не пишет запросы в stderr."""
+
+
+@pytest.fixture
+def url():
+    """Адрес локального сервера с keep-alive."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def delta(before):
+    """Возвращает прирост счётчиков соединений с момента before."""
+    after = connection_stats()
+    return {name: after[name] - before[name] for name in after}
+
+
+def test_session_reuses_connection(url):
+    """Повторные запросы идут по уже открытому соединению."""
+    session = PooledSession(retries=0)
+    before = connection_stats()
+
+    for _ in range(3):
+        assert session.get(url).json() == {}
+
+    assert delta(before) == {'reused': 2, 'opened': 1}
+    session.close()
+
+
+def test_closed_session_opens_new_connection(url):
+    """После закрытия пула соединение открывается заново."""
+    session = PooledSession(retries=0)
+    session.get(url)
+    session.close()
+    before = connection_stats()
+
+    session.get(url)
+
+    assert delta(before) == {'reused': 0, 'opened': 1}
+    session.close()
@@ -0,0 +1,93 @@
+"""Приём обновлений через long polling."""
+import threading
+import time
+
+from collections import namedtuple
+
+from ingest import UpdatePoller
+
+Update = namedtuple('Update', 'update_id')
+
+
+class FakeBot:
+    """Бот, отдающий заданные пачки обновлений, а потом ждущий."""
+
+    def __init__(self, *batches, fail=False):
+        """Запоминает пачки; fail — обработчики выбрасывают ошибку."""
+        self.batches = [[Update(update_id) for update_id in batch]
+                        for batch in batches]
+        self.fail = fail
+        self.offsets = []
+        self.processed = []
+        self.idle = threading.Event()
+
+    def get_updates(self, offset=None, **kwargs):
+        """Возвращает следующую пачку; без пачек ждёт, как long polling."""
+        self.offsets.append(offset)
+        if self.batches:
+            return self.batches.pop(0)
+        self.idle.set()
+        time.sleep(60)
+        return []
+
+    def process_new_updates(self, updates):
+        """Запоминает переданные обработчикам обновления."""
+        self.processed.append([update.update_id for update in updates])
+        if self.fail:
+            raise ValueError('сбой обработчика')
+
+
+def run_poller(bot, saved=None):
+    """Запускает приём и возвращает сохранённые смещения."""
+    offsets = []
+    saved_all = threading.Event()
+    total = len(bot.batches)
+
+    def save_offset(offset):
+        offsets.append(offset)
+        if len(offsets) == total:
+            saved_all.set()
+
+    UpdatePoller(bot, lambda: saved, save_offset).start()
+    assert bot.idle.wait(1)
+    assert saved_all.wait(1)
+    return offsets
+
+
+def test_offset_is_saved_after_each_batch():
+    """После обработки пачки сохраняется смещение следующего обновления."""
+    bot = FakeBot([1, 2], [3])
+
+    assert run_poller(bot) == [3, 4]
+    assert bot.processed == [[1, 2], [3]]
+    assert bot.offsets == [None, 3, 4]
+
+
+def test_saved_offset_is_used_after_restart():
+    """После перезапуска приём продолжается с сохранённого смещения."""
+    bot = FakeBot([8])
+
+    run_poller(bot, saved=8)
+
+    assert bot.offsets[0] == 8
+
+
+def test_offset_is_saved_when_handlers_fail():
+    """Ошибка обработчика не заставляет получать пачку заново."""
+    bot = FakeBot([5], fail=True)
+
+    assert run_poller(bot) == [6]
+
+
+def test_timeout_grows_while_idle():
+    """Таймаут растёт без обновлений и сокращается при активности."""
+    poller = UpdatePoller(
+        FakeBot(), lambda: None, lambda offset: None,
+        min_timeout=10, max_timeout=50)
+
+    for _ in range(3):
+        poller._adapt([])
+    assert poller.timeout == 50
+
+    poller._adapt([Update(1)])
+    assert poller.timeout == 10
@@ -0,0 +1,61 @@
+"""Метрики в текстовом формате Prometheus."""
+from metrics import Registry
+from metrics_server import MetricsServer
+
+
+def test_counter_and_gauge_exposition():
+    """Счётчики и показатели выводятся с HELP, TYPE и метками."""
+    registry = Registry()
+    registry.counter('sent_total', 'Отправлено.', {'code': '200'}).inc(2)
+    registry.counter('sent_total', 'Отправлено.', {'code': '429'}).inc()
+    registry.gauge('queue_depth', 'Глубина\nочереди.').set(3)
+
+    assert registry.exposition() == '\n'.join([
+        '# HELP queue_depth Глубина\\nочереди.',
+        '# TYPE queue_depth gauge',
+        'queue_depth 3.0',
+        '# HELP sent_total Отправлено.',
+        '# TYPE sent_total counter',
+        'sent_total{code="200"} 2.0',
+        'sent_total{code="429"} 1.0',
+        '',
+    ])
+
+
+def test_histogram_buckets_are_cumulative():
+    """Корзины гистограммы накопительные, с +Inf, суммой и числом."""
+    registry = Registry()
+    histogram = registry.histogram('send_seconds', 'Отправка.',
+                                   buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    lines = registry.exposition().splitlines()
+
+    assert lines[2:] == [
+        'send_seconds_bucket{le="0.1"} 1',
+        'send_seconds_bucket{le="1.0"} 2',
+        'send_seconds_bucket{le="+Inf"} 3',
+        'send_seconds_sum 5.55',
+        'send_seconds_count 3',
+    ]
+
+
+def test_label_values_are_escaped():
+    """Кавычки и обратная косая черта в метках экранируются."""
+    registry = Registry()
+    registry.counter('errors_total', 'Ошибки.', {'path': 'a"b\\c'}).inc()
+
+    assert 'errors_total{path="a\\"b\\\\c"} 1.0' in registry.exposition()
+
+
+def test_server_renders_at_most_once_per_interval():
+    """Ответ /metrics пересобирается не чаще min_interval."""
+    registry = Registry()
+    counter = registry.counter('polls_total', 'Опросы.')
+    server = MetricsServer(registry, min_interval=60)
+
+    first = server.render()
+    counter.inc()
+
+    assert server.render() == first
@@ -0,0 +1,106 @@
+"""Очередь исходящих сообщений Telegram."""
+import asyncio
+import time
+
+import pytest
+
+from telebot import apihelper
+
+import outbound
+from outbound import AsyncOutboundQueue, OutboundQueue
+
+
+def too_many_requests(retry_after):
+    """Создаёт ответ Telegram 429 с паузой retry_after секунд."""
+    return apihelper.ApiTelegramException('sendMessage', None, {
+        'error_code': 429,
+        'description': 'Too Many Requests',
+        'parameters': {'retry_after': retry_after},
+    })
+
+
+class FlakySender:
+    """Отправитель, который сначала выбрасывает заданные ошибки."""
+
+    def __init__(self, *errors):
+        """Запоминает ошибки для первых попыток."""
+        self.errors = list(errors)
+        self.attempts = []
+
+    def __call__(self, chat_id, text):
+        """Учитывает попытку и выбрасывает очередную ошибку."""
+        self.attempts.append((time.monotonic(), chat_id, text))
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def make_queue(queue_class, send):
+    """Создаёт очередь без ограничения темпа отправки."""
+    return queue_class(send, workers=2, global_rate=1000, chat_rate=1000)
+
+
+def test_retry_after_is_read_from_any_client():
+    """retry_after берётся из ответа 429 и ошибок асинхронного клиента."""
+    class AsyncError(Exception):
+        error_code = 429
+        result_json = {'parameters': {'retry_after': 3}}
+
+    assert outbound.retry_after(too_many_requests(5)) == 5
+    assert outbound.retry_after(AsyncError()) == 3
+    assert outbound.retry_after(ValueError()) is None
+
+
+def test_too_many_requests_is_retried_after_pause():
+    """После 429 сообщение отправляется снова, когда пауза истекла."""
+    sender = FlakySender(too_many_requests(0.2))
+    queue = make_queue(OutboundQueue, sender)
+    limited = outbound.RATE_LIMITED.value
+
+    assert queue.enqueue('1', 'текст').result(timeout=1) is True
+
+    first, second = sender.attempts
+    assert second[0] - first[0] >= 0.2
+    assert outbound.RATE_LIMITED.value == limited + 1
+
+
+def test_other_errors_reach_the_future():
+    """Прочие ошибки не повторяются и возвращаются через Future."""
+    sender = FlakySender(ValueError('нет сети'))
+    queue = make_queue(OutboundQueue, sender)
+
+    with pytest.raises(ValueError):
+        queue.enqueue('1', 'текст').result(timeout=1)
+    assert len(sender.attempts) == 1
+
+
+def test_async_queue_pauses_on_too_many_requests():
+    """Асинхронная очередь тоже ждёт retry_after и повторяет отправку."""
+    sender = FlakySender(too_many_requests(0.2))
+
+    async def send(chat_id, text):
+        sender(chat_id, text)
+
+    async def deliver():
+        queue = make_queue(AsyncOutboundQueue, send)
+        return await queue.enqueue('1', 'текст')
+
+    assert asyncio.run(deliver()) is True
+    first, second = sender.attempts
+    assert second[0] - first[0] >= 0.2
+
+
+def test_async_queue_keeps_chat_order():
+    """Сообщения одного чата уходят в порядке постановки."""
+    sender = FlakySender()
+
+    async def send(chat_id, text):
+        await asyncio.sleep(0)
+        sender(chat_id, text)
+
+    async def deliver():
+        queue = make_queue(AsyncOutboundQueue, send)
+        futures = [queue.enqueue('1', str(number)) for number in range(5)]
+        await asyncio.gather(*futures)
+
+    asyncio.run(deliver())
+    assert [text for _, _, text in sender.attempts] == list('01234')
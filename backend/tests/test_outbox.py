@@ -0,0 +1,152 @@
+"""Доставка уведомлений из outbox."""
+import time
+
+from concurrent.futures import Future
+
+from outbox import OutboxDrainer
+from outbound import is_permanent_failure
+from state_store import StateStore
+
+
+class TelegramError(Exception):
+    """Ошибка Telegram с кодом ответа."""
+
+    def __init__(self, error_code):
+        """Создаёт ошибку с кодом error_code."""
+        super().__init__(f'Error code: {error_code}')
+        self.error_code = error_code
+
+
+class FakeSender:
+    """Запоминает отправленные сообщения и отвечает по настройке."""
+
+    def __init__(self, errors=None):
+        """Создаёт отправителя; errors — {чат: код ошибки Telegram}."""
+        self.errors = errors or {}
+        self.sent = []
+
+    def __call__(self, chat_id, text):
+        """Отправляет сообщение и возвращает завершённый Future."""
+        future = Future()
+        self.sent.append((chat_id, text))
+        if chat_id in self.errors:
+            future.set_exception(TelegramError(self.errors[chat_id]))
+        else:
+            future.set_result(True)
+        return future
+
+    def texts(self, chat_id):
+        """Возвращает тексты, отправленные в чат."""
+        return [text for sent_to, text in self.sent if sent_to == chat_id]
+
+
+def make_drainer(store, sender, clock=time.time, **kwargs):
+    """Создаёт отправителя outbox с окончательными ошибками Telegram."""
+    return OutboxDrainer(
+        store, sender, clock=clock, permanent=is_permanent_failure, **kwargs)
+
+
+def test_replays_pending_after_restart(db_path):
+    """Уведомления, не отправленные до перезапуска, досылаются."""
+    before = StateStore(db_path)
+    before.add_outbox('1:hw:approved', '1', 'Принято')
+    before.flush()
+
+    store = StateStore(db_path)
+    sender = FakeSender()
+    drainer = make_drainer(store, sender)
+    drainer.drain_once()
+    drainer.drain_once()
+
+    assert sender.sent == [('1', 'Принято')]
+    assert store.pending_outbox() == []
+
+
+def test_repeated_key_is_sent_once(store):
+    """Повторно записанное изменение не дублирует уведомление."""
+    store.add_outbox('1:hw:approved', '1', 'Принято')
+    store.flush()
+    store.add_outbox('1:hw:approved', '1', 'Принято')
+    sender = FakeSender()
+    drainer = make_drainer(store, sender)
+
+    drainer.drain_once()
+
+    assert sender.sent == [('1', 'Принято')]
+
+
+def test_coalesces_notifications_of_one_chat(store, clock):
+    """Уведомления чата за окно приходят одним сообщением."""
+    store.add_outbox('1:a', '1', 'первое')
+    store.add_outbox('1:b', '1', 'второе')
+    sender = FakeSender()
+    drainer = make_drainer(store, sender, clock, window=5, max_latency=30)
+
+    wait = drainer.drain_once()
+    assert sender.sent == []
+    assert 0 < wait < 6
+
+    clock.advance(6)
+    drainer.drain_once()
+    assert sender.sent == [('1', 'первое\n\nвторое')]
+
+
+def test_failing_chat_does_not_block_others(store):
+    """Накопившиеся уведомления недоступного чата не задерживают другие."""
+    for number in range(60):
+        store.add_outbox(f'-100:{number}', '-100', f'аудит {number}')
+    store.add_outbox('7:hw', '7', 'Принято')
+    sender = FakeSender(errors={'-100': 502})
+    drainer = make_drainer(store, sender)
+
+    drainer.drain_once()
+
+    assert sender.texts('7') == ['Принято']
+
+
+def test_transient_failure_is_retried_after_backoff(store, clock):
+    """Чат с временной ошибкой получает сообщение после паузы."""
+    store.add_outbox('1:hw', '1', 'Принято')
+    sender = FakeSender(errors={'1': 502})
+    drainer = make_drainer(store, sender, clock, backoff_base=10)
+    clock.advance(1)
+
+    drainer.drain_once()
+    drainer.drain_once()
+    assert len(sender.sent) == 1
+    assert drainer.stats() == {'1': (0, 1)}
+
+    del sender.errors['1']
+    clock.advance(11)
+    drainer.drain_once()
+    assert sender.texts('1') == ['Принято', 'Принято']
+    assert drainer.stats() == {'1': (1, 1)}
+    assert store.pending_outbox() == []
+
+
+def test_permanent_failure_is_dead_lettered(store, clock):
+    """После 403 уведомления чата больше не отправляются."""
+    store.add_outbox('-100:hw', '-100', 'Принято')
+    sender = FakeSender(errors={'-100': 403})
+    drainer = make_drainer(store, sender, clock)
+    clock.advance(1)
+
+    drainer.drain_once()
+    clock.advance(3600)
+    drainer.drain_once()
+
+    assert len(sender.sent) == 1
+    assert store.pending_outbox() == []
+
+
+def test_long_digest_is_split(store):
+    """Сводка длиннее предела Telegram делится на несколько сообщений."""
+    for number in range(3):
+        store.add_outbox(f'1:{number}', '1', str(number) * 1500)
+    sender = FakeSender()
+    drainer = make_drainer(store, sender)
+
+    drainer.drain_once()
+
+    assert len(sender.texts('1')) == 2
+    assert all(len(text) <= 4096 for text in sender.texts('1'))
@@ -0,0 +1,87 @@
+"""Конвейер стадий опроса."""
+import threading
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+
+def add(amount):
+    """Стадия, прибавляющая amount к заданию."""
+    return lambda job: job + amount
+
+
+def test_job_passes_all_stages():
+    """Задание проходит стадии по порядку, None останавливает его."""
+    pipeline = Pipeline('test_order', [
+        Stage('double', lambda job: job * 2, 1),
+        Stage('skip_odd', lambda job: job if job % 4 else None, 1),
+        Stage('add', add(1), 2),
+    ])
+
+    assert pipeline.submit(1).result(timeout=1) == 3
+    assert pipeline.submit(2).result(timeout=1) is None
+    assert pipeline.timings()['add'][0] == 1
+    pipeline.stop()
+
+
+def test_stage_error_reaches_future():
+    """Исключение стадии выбрасывается из result(), конвейер работает."""
+    def check(job):
+        if job < 0:
+            raise ValueError('отрицательное задание')
+        return job
+
+    pipeline = Pipeline('test_error', [
+        Stage('check', check, 1), Stage('add', add(1), 1)])
+
+    with pytest.raises(ValueError):
+        pipeline.submit(-1).result(timeout=1)
+    assert pipeline.submit(1).result(timeout=1) == 2
+    pipeline.stop()
+
+
+def test_full_queue_blocks_submit():
+    """Медленная стадия задерживает приём новых заданий."""
+    release = threading.Event()
+
+    def slow(job):
+        release.wait()
+        return job
+
+    pipeline = Pipeline('test_backpressure', [
+        Stage('fast', add(0), 1), Stage('slow', slow, 1)], queue_size=1)
+    # По одному заданию: в медленной стадии, в её очереди,
+    # у быстрой стадии и в очереди быстрой стадии
+    futures = [pipeline.submit(job) for job in range(4)]
+    submitted = threading.Event()
+
+    def submit():
+        futures.append(pipeline.submit(4))
+        submitted.set()
+
+    blocked = threading.Thread(target=submit)
+    blocked.start()
+
+    assert not submitted.wait(0.05)
+
+    release.set()
+    blocked.join()
+    assert [future.result(timeout=1) for future in futures] == [0, 1, 2, 3, 4]
+    pipeline.stop()
+
+
+def test_stop_finishes_accepted_jobs():
+    """Остановка дорабатывает принятые задания и не принимает новые."""
+    pipeline = Pipeline('test_stop', [
+        Stage('first', add(1), 2), Stage('second', add(1), 2)])
+    futures = [pipeline.submit(job) for job in range(10)]
+    threads = list(pipeline._threads)
+
+    pipeline.stop()
+
+    assert [future.result(timeout=0) for future in futures] == list(
+        range(2, 12))
+    assert not any(thread.is_alive() for thread in threads)
+    with pytest.raises(RuntimeError):
+        pipeline.submit(0)
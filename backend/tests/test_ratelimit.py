@@ -0,0 +1,204 @@
+"""Корзины токенов, ограничители частоты и скользящее окно."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import ratelimit
+from ratelimit import (
+    BACKGROUND, INTERACTIVE, AsyncRateLimiter, RateLimiter,
+    SlidingWindowThrottle, TokenBucket)
+
+# Ожидающие перепроверяют глобальную корзину каждые 1 / RATE секунд
+RATE = 100
+
+
+def limiter_args(clock, **kwargs):
+    """Параметры ограничителя с пустеющей после первого запроса корзиной."""
+    args = dict(rate=RATE, burst=1, key_rate=1, key_burst=1, clock=clock)
+    args.update(kwargs)
+    return args
+
+
+def wait_for(condition):
+    """Ждёт, пока другой поток не выполнит условие."""
+    while not condition():
+        time.sleep(0.001)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    """Корзина пополняется со скоростью rate и не выше capacity."""
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    for _ in range(3):
+        assert bucket.delay() == 0
+        bucket.take()
+
+    assert bucket.delay() == 0.5
+    clock.advance(10)
+    assert bucket.full
+
+
+def test_bucket_reserve_goes_into_debt(clock):
+    """Резерв сверх остатка возвращает время до погашения долга."""
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 1
+    assert bucket.reserve() == 2
+    assert not bucket.full
+
+    clock.advance(3)
+    assert bucket.full
+
+
+def test_key_bucket_delays_repeated_requests(clock, monkeypatch):
+    """Второй запрос того же токена ждёт пополнения его корзины."""
+    sleeps = []
+    monkeypatch.setattr(ratelimit.time, 'sleep', sleeps.append)
+    limiter = RateLimiter(**limiter_args(clock, burst=10))
+
+    limiter.acquire('token')
+    limiter.acquire('other')
+    limiter.acquire('token')
+
+    assert sleeps == [1]
+
+
+def test_only_full_key_buckets_are_evicted(clock):
+    """Сверх max_keys выбрасываются давние корзины, но только полные."""
+    limiter = RateLimiter(**limiter_args(clock, burst=10, max_keys=2))
+    for key in ('first', 'second', 'third'):
+        limiter.acquire(key)
+    # Неполные корзины хранятся, иначе лимит токена обнулялся бы
+    assert list(limiter._keys) == ['first', 'second', 'third']
+
+    clock.advance(10)
+    limiter.acquire('fourth')
+
+    assert list(limiter._keys) == ['third', 'fourth']
+
+
+def test_interactive_request_preempts_background(clock):
+    """Запрос по /status проходит раньше ждущего фонового опроса."""
+    limiter = RateLimiter(**limiter_args(clock))
+    limiter.acquire()
+    order = []
+
+    def acquire(priority):
+        limiter.acquire(priority=priority)
+        order.append(priority)
+
+    threads = []
+    for priority in (BACKGROUND, INTERACTIVE):
+        thread = threading.Thread(target=acquire, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: len(limiter._waiters) == len(threads))
+
+    clock.advance(1)
+    wait_for(lambda: order)
+    clock.advance(1)
+    for thread in threads:
+        thread.join()
+
+    assert order == [INTERACTIVE, BACKGROUND]
+
+
+def test_async_interactive_request_preempts_background(clock):
+    """В асинхронном ограничителе приоритет работает так же."""
+    async def scenario():
+        limiter = AsyncRateLimiter(**limiter_args(clock))
+        await limiter.acquire()
+        order = []
+
+        async def acquire(priority):
+            await limiter.acquire(priority=priority)
+            order.append(priority)
+
+        tasks = [asyncio.create_task(acquire(BACKGROUND))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(acquire(INTERACTIVE)))
+        await asyncio.sleep(0.02)
+
+        clock.advance(1)
+        while not order:
+            await asyncio.sleep(0.001)
+        clock.advance(1)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == [INTERACTIVE, BACKGROUND]
+
+
+def test_async_cancelled_waiter_leaves_queue(clock):
+    """Отменённый первый в очереди уходит из кучи и будит следующего."""
+    async def scenario():
+        limiter = AsyncRateLimiter(**limiter_args(clock))
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.02)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        clock.advance(1)
+        await second
+        return limiter._waiters
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_allows_up_to_limit(clock):
+    """В окне проходят limit событий, следующие отклоняются."""
+    throttle = SlidingWindowThrottle('test', limit=2, window=30, clock=clock)
+
+    assert [throttle.allow('chat') for _ in range(3)] == [True, True, False]
+
+
+def test_window_slides(clock):
+    """Событие снова проходит, когда старое выходит из окна."""
+    throttle = SlidingWindowThrottle('test', limit=2, window=30, clock=clock)
+    throttle.allow('chat')
+    clock.advance(10)
+    throttle.allow('chat')
+
+    clock.advance(20)
+    assert throttle.allow('chat')
+    assert not throttle.allow('chat')
+    clock.advance(10)
+    assert throttle.allow('chat')
+
+
+def test_rejected_events_do_not_extend_window(clock):
+    """Отклонённые события не отодвигают момент, когда лимит вернётся."""
+    throttle = SlidingWindowThrottle('test', limit=1, window=30, clock=clock)
+    throttle.allow('chat')
+    for _ in range(29):
+        clock.advance(1)
+        throttle.allow('chat')
+
+    clock.advance(1)
+    assert throttle.allow('chat')
+
+
+def test_keys_are_independent(clock):
+    """Лимит одного чата не влияет на другой."""
+    throttle = SlidingWindowThrottle('test', limit=1, window=30, clock=clock)
+
+    assert throttle.allow('first')
+    assert throttle.allow('second')
+    assert not throttle.allow('first')
+
+
+def test_forgets_oldest_keys(clock):
+    """Сверх max_keys забываются самые давние чаты."""
+    throttle = SlidingWindowThrottle(
+        'test', limit=1, window=30, max_keys=2, clock=clock)
+    for key in ('first', 'second', 'third'):
+        throttle.allow(key)
+
+    assert throttle.allow('first')
+    assert not throttle.allow('third')
@@ -0,0 +1,70 @@
+"""Шаблоны сообщений и клавиатура."""
+import json
+
+from render import LOCALES, Templates, status_keyboard, templates
+
+TEXTS = dict(
+    LOCALES['ru'],
+    verdicts={'approved': 'принята {без полей}'},
+    status='{homework_name}: {verdict}',
+)
+
+
+def test_verdict_is_bound_per_status():
+    """Вердикт подставлен заранее, остаётся название работы."""
+    rendered = templates().render(
+        'changed', 'approved', homework_name='hw.zip')
+
+    assert rendered == (
+        'Статус изменён!\n'
+        'Работа: hw.zip\n'
+        'Новый статус: Работа проверена: ревьюеру всё понравилось. Ура!')
+
+
+def test_braces_in_verdict_are_escaped():
+    """Фигурные скобки вердикта не считаются полями шаблона."""
+    rendered = Templates(TEXTS).render(
+        'status', 'approved', homework_name='hw.zip')
+
+    assert rendered == 'hw.zip: принята {без полей}'
+
+
+def test_values_are_not_formatted_again():
+    """Поля в названии работы выводятся как есть."""
+    rendered = Templates(TEXTS).render(
+        'status', 'approved', homework_name='{verdict}')
+
+    assert rendered == '{verdict}: принята {без полей}'
+
+
+def test_unknown_status_is_shown_as_is():
+    """Для статуса без вердикта выводится сам статус."""
+    rendered = Templates(TEXTS).render(
+        'status', 'unknown', homework_name='hw.zip')
+
+    assert rendered == 'hw.zip: unknown'
+
+
+def test_text_fills_values_only_when_given():
+    """Текст без значений возвращается без форматирования."""
+    texts = templates()
+
+    assert texts.text('register_usage') == 'Использование: /register <токен>'
+    assert texts.text('digest_header', count=3) == 'Изменений статусов: 3'
+
+
+def test_unknown_locale_falls_back_to_default():
+    """Неизвестный язык заменяется основным, шаблоны собираются раз."""
+    assert templates('xx').texts is LOCALES['ru']
+    assert templates() is templates()
+
+
+def test_keyboard_is_serialized_once():
+    """Клавиатура — готовая JSON-строка, общая для всех ответов."""
+    keyboard = status_keyboard()
+
+    assert keyboard is status_keyboard()
+    assert json.loads(keyboard) == {
+        'keyboard': [[{'text': 'Проверить статус домашнего задания'}]],
+        'resize_keyboard': True,
+    }
@@ -0,0 +1,113 @@
+"""Экспоненциальная задержка и предохранитель."""
+import pytest
+
+import resilience
+from exceptions import CircuitOpenError
+from resilience import CLOSED, HALF_OPEN, OPEN, Backoff, CircuitBreaker
+
+
+@pytest.fixture
+def upper_bound(monkeypatch):
+    """Убирает джиттер: задержка всегда равна верхней границе."""
+    monkeypatch.setattr(resilience.random, 'uniform', lambda low, high: high)
+
+
+def test_backoff_doubles_up_to_cap(upper_bound):
+    """Задержка удваивается и упирается в cap."""
+    backoff = Backoff(base=1, cap=8)
+
+    delays = [backoff.next_delay() for _ in range(6)]
+
+    assert delays == [1, 2, 4, 8, 8, 8]
+
+
+def test_backoff_reset_starts_over(upper_bound):
+    """После успеха задержка снова начинается с base."""
+    backoff = Backoff(base=1, cap=8)
+    for _ in range(3):
+        backoff.next_delay()
+
+    backoff.reset()
+
+    assert backoff.next_delay() == 1
+
+
+def test_backoff_survives_long_outage():
+    """Тысячи ошибок подряд не переполняют степень."""
+    backoff = Backoff(base=1, cap=30)
+
+    delays = [backoff.next_delay() for _ in range(5000)]
+
+    assert all(0 <= delay <= 30 for delay in delays)
+
+
+@pytest.fixture
+def breaker(clock):
+    """Предохранитель на две ошибки с паузой 60 секунд."""
+    return CircuitBreaker(
+        'test', failure_threshold=2, recovery_timeout=60, clock=clock)
+
+
+def test_breaker_opens_after_threshold(breaker):
+    """После failure_threshold ошибок подряд вызовы отклоняются."""
+    breaker.before_call()
+    breaker.on_failure()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.on_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_failures(breaker):
+    """Успешный вызов обнуляет счётчик ошибок."""
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_breaker_lets_one_probe_through(breaker, clock):
+    """После паузы пропускается ровно один пробный вызов."""
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.advance(60)
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.on_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_breaker_failed_probe_reopens(breaker, clock):
+    """Неудачный пробный вызов снова размыкает цепь."""
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.advance(60)
+    breaker.before_call()
+
+    breaker.on_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_release_frees_probe(breaker, clock):
+    """Отменённый пробный вызов не занимает пробу навсегда."""
+    breaker.on_failure()
+    breaker.on_failure()
+    clock.advance(60)
+    breaker.before_call()
+
+    breaker.release()
+
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
@@ -0,0 +1,87 @@
+"""Адаптивный интервал опроса API."""
+import pytest
+
+from homework import polled_homeworks
+from pipeline import PollJob
+from scheduler import AdaptivePollScheduler
+
+
+@pytest.fixture
+def scheduler(clock):
+    """Планировщик 60–3600 секунд с базой 600 и тремя пустыми циклами."""
+    return AdaptivePollScheduler(
+        min_interval=60, base_interval=600, max_interval=3600,
+        backoff_factor=2, idle_cycles=3, clock=clock)
+
+
+def homework(status, homework_id=1):
+    """Создаёт работу в формате ответа API."""
+    return {'id': homework_id, 'homework_name': 'hw.zip', 'status': status}
+
+
+def test_reviewing_polls_at_minimum(scheduler):
+    """Пока работа на ревью, опрос идёт с минимальным интервалом."""
+    scheduler.observe([homework('reviewing')])
+
+    assert scheduler.interval == 60
+
+
+def test_reviewing_is_remembered_between_polls(scheduler):
+    """Работа остаётся на ревью, пока не придёт её новый статус."""
+    scheduler.observe([homework('reviewing')])
+    scheduler.observe([])
+    assert scheduler.interval == 60
+
+    scheduler.observe([homework('approved')])
+    assert scheduler.interval == 600
+
+
+def test_idle_polls_back_off_to_maximum(scheduler):
+    """После idle_cycles пустых опросов интервал растёт до максимума."""
+    intervals = []
+    for _ in range(8):
+        scheduler.observe([])
+        intervals.append(scheduler.interval)
+
+    assert intervals == [600, 600, 600, 1200, 2400, 3600, 3600, 3600]
+
+
+def test_reset_returns_to_minimum(scheduler):
+    """Запрос /status сокращает интервал до минимума."""
+    for _ in range(5):
+        scheduler.observe([])
+
+    scheduler.reset()
+
+    assert scheduler.interval == 60
+
+
+def test_sleep_uses_reduced_interval(scheduler, clock):
+    """После reset() опрос не ждёт остаток прежнего интервала."""
+    for _ in range(5):
+        scheduler.observe([])
+    clock.advance(60)
+
+    scheduler.reset()
+    scheduler.sleep()
+
+    assert scheduler.interval == 60
+
+
+def test_unchanged_response_is_not_idle(scheduler):
+    """Повторённый ответ с работами не считается простоем."""
+    for _ in range(5):
+        scheduler.observe([homework('approved')])
+
+    assert scheduler.interval == 600
+
+
+def test_unchanged_poll_reports_cached_homeworks():
+    """Опрос без изменений передаёт планировщику работы из ответа."""
+    job = PollJob('owner', 0)
+    job.response = {'homeworks': [homework('reviewing')], 'current_date': 1}
+
+    assert polled_homeworks(job) == [homework('reviewing')]
+
+    job.homeworks = []
+    assert polled_homeworks(job) == []
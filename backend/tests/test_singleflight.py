@@ -0,0 +1,130 @@
+"""Объединение одинаковых одновременных запросов."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import singleflight
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def wait_coalesced(count, started):
+    """Ждёт, пока count вызовов присоединятся к идущему запросу."""
+    deadline = time.monotonic() + 1
+    while singleflight.CALLS_COALESCED.value < started + count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, func, callers):
+    """Вызывает flight.do из нескольких потоков, пока func не отпущена."""
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            flight.do('key', func)))
+        for _ in range(callers)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_share_one_request():
+    """Одновременные вызовы с одним ключом выполняют func один раз."""
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def request():
+        calls.append(1)
+        release.wait(1)
+        return 'ответ'
+
+    started = singleflight.CALLS_COALESCED.value
+    threads, results = run_concurrently(flight, request, 3)
+    wait_coalesced(2, started)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['ответ'] * 3
+
+
+def test_error_reaches_every_caller():
+    """Ошибка общего запроса получают все ожидающие."""
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def request():
+        release.wait(1)
+        raise ValueError('сбой')
+
+    def call():
+        try:
+            flight.do('key', request)
+        except ValueError as error:
+            errors.append(error)
+
+    started = singleflight.CALLS_COALESCED.value
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    wait_coalesced(1, started)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 2
+    assert errors[0] is errors[1]
+
+
+def test_finished_call_is_not_reused():
+    """После завершения запроса следующий вызов выполняется заново."""
+    flight = SingleFlight()
+    calls = []
+
+    for _ in range(2):
+        flight.do('key', calls.append, 1)
+
+    assert calls == [1, 1]
+
+
+def test_async_calls_share_one_request():
+    """Асинхронные вызовы с одним ключом выполняют корутину один раз."""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def request():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'ответ'
+
+    async def gather():
+        return await asyncio.gather(
+            *(flight.do('key', request) for _ in range(3)))
+
+    assert asyncio.run(gather()) == ['ответ'] * 3
+    assert calls == [1]
+
+
+def test_async_cancelled_waiter_keeps_request():
+    """Отмена одного ожидающего не отменяет общий запрос."""
+    flight = AsyncSingleFlight()
+
+    async def request():
+        await asyncio.sleep(0.01)
+        return 'ответ'
+
+    async def cancel_one():
+        first = asyncio.create_task(flight.do('key', request))
+        second = asyncio.create_task(flight.do('key', request))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(cancel_one()) == 'ответ'
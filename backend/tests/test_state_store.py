@@ -0,0 +1,87 @@
+"""Хранилище состояния опроса в SQLite."""
+import sqlite3
+import time
+
+from state_store import StateStore
+
+
+def query(db_path, sql):
+    """Выполняет запрос отдельным соединением, мимо очереди записи."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_writes_are_batched_until_flush(db_path):
+    """Записи видны сразу, а в базу попадают одной транзакцией."""
+    store = StateStore(db_path, flush_interval=60)
+    store.set_cursor('owner', 100, 'approved')
+    store.set_status('owner', 'hw.zip', 'approved', 100)
+
+    assert store.get_cursor('owner') == (100, 'approved')
+    assert store.get_statuses('owner') == {'hw.zip': ('approved', '100')}
+    assert query(db_path, 'SELECT * FROM cursors') == []
+
+    store.flush()
+
+    assert query(db_path, 'SELECT * FROM cursors') == [
+        ('owner', 100, 'approved')]
+    assert query(db_path, 'SELECT homework FROM homework_statuses') == [
+        ('hw.zip',)]
+
+
+def test_full_batch_wakes_writer(db_path):
+    """Накопленная пачка записывается, не дожидаясь интервала."""
+    store = StateStore(db_path, flush_interval=60, batch_size=2)
+    store.set_cursor('first', 1, None)
+    store.set_cursor('second', 2, None)
+
+    while len(query(db_path, 'SELECT * FROM cursors')) < 2:
+        time.sleep(0.001)
+
+
+def test_failed_write_is_requeued(db_path):
+    """Изменения из сорвавшейся транзакции записываются следующей."""
+    store = StateStore(db_path, flush_interval=60)
+    store.set_cursor('owner', 100, None)
+    store.set_board('1', 5, b'digest')
+    query(db_path, 'DROP TABLE boards')
+
+    store.flush()
+
+    # Транзакция откатилась целиком, изменения снова в очереди
+    assert query(db_path, 'SELECT * FROM cursors') == []
+    assert store.get_board('1') == (5, b'digest')
+    query(db_path, 'CREATE TABLE boards (chat_id TEXT PRIMARY KEY, '
+                   'message_id INTEGER NOT NULL, digest BLOB NOT NULL)')
+    store.set_cursor('owner', 200, None)
+
+    store.flush()
+
+    assert query(db_path, 'SELECT * FROM cursors') == [('owner', 200, None)]
+    assert query(db_path, 'SELECT chat_id, message_id FROM boards') == [
+        ('1', 5)]
+
+
+def test_old_outbox_gains_new_columns(db_path):
+    """В базе старой версии недостающие столбцы добавляются."""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            'CREATE TABLE outbox (key TEXT PRIMARY KEY, '
+            'chat_id TEXT NOT NULL, text TEXT NOT NULL, '
+            'created_at REAL NOT NULL, delivered_at REAL)')
+        conn.execute(
+            "INSERT INTO outbox VALUES ('1:hw', '1', 'Принято', 1, NULL)")
+    conn.close()
+    store = StateStore(db_path)
+
+    assert store.pending_outbox() == [('1:hw', '1', 'Принято', 1.0)]
+
+    store.mark_dead('1:hw', 'Forbidden')
+    store.flush()
+
+    assert store.pending_outbox() == []
+    assert query(db_path, 'SELECT error FROM outbox') == [('Forbidden',)]
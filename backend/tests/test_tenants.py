@@ -0,0 +1,113 @@
+"""Хранилище студентов и общий планировщик опроса."""
+from concurrent.futures import Future
+
+import pytest
+
+from tenants import TenantPoller, TenantStore
+
+
+@pytest.fixture
+def tenants(tmp_path):
+    """Хранилище студентов во временном каталоге."""
+    return TenantStore(str(tmp_path / 'tenants.sqlite3'))
+
+
+def poll_now(poller, chat_id):
+    """Выполняет опрос студента так, как его запускает run()."""
+    poller._slots.acquire()
+    poller._poll(chat_id)
+
+
+def scheduled(poller):
+    """Возвращает чаты, стоящие в куче расписания."""
+    return [chat_id for _, chat_id in poller._heap]
+
+
+def test_register_and_update(tenants):
+    """Повторная регистрация сбрасывает последний статус."""
+    tenants.register(1, 'token', 100)
+    tenants.update_state(1, 200, 'approved')
+    assert tenants.get(1) == (1, 'token', 200, 'approved')
+
+    tenants.register(1, 'new', 300)
+
+    assert tenants.get(1) == (1, 'new', 300, None)
+    assert tenants.count() == 1
+
+
+def test_unregister(tenants):
+    """Удаление сообщает, был ли студент зарегистрирован."""
+    tenants.register(1, 'token', 100)
+
+    assert tenants.unregister(1) is True
+    assert tenants.unregister(1) is False
+    assert tenants.get(1) is None
+
+
+def test_chat_ids_are_paged(tenants):
+    """Постраничный перебор отдаёт все чаты по порядку."""
+    for chat_id in (5, 1, 3, 4, 2):
+        tenants.register(chat_id, 'token', 0)
+
+    assert list(tenants.chat_ids(batch_size=2)) == [1, 2, 3, 4, 5]
+
+
+def test_sync_poll_is_rescheduled(tenants):
+    """После опроса без Future студент сразу снова в расписании."""
+    tenants.register(1, 'token', 0)
+    polled = []
+    poller = TenantPoller(tenants, polled.append, workers=1)
+    poller.add(1)
+    poller._heap.clear()
+
+    poll_now(poller, 1)
+
+    assert polled == [tenants.get(1)]
+    assert scheduled(poller) == [1]
+
+
+def test_pending_poll_is_rescheduled_on_completion(tenants):
+    """Пока задание не завершилось, студент не опрашивается снова."""
+    tenants.register(1, 'token', 0)
+    job = Future()
+    poller = TenantPoller(tenants, lambda tenant: job, workers=1)
+    poller.add(1)
+    poller._heap.clear()
+
+    poll_now(poller, 1)
+    assert scheduled(poller) == []
+
+    job.set_result(None)
+
+    assert scheduled(poller) == [1]
+
+
+def test_failed_poll_is_rescheduled(tenants):
+    """Ошибка опроса не выбрасывает студента из расписания."""
+    tenants.register(1, 'token', 0)
+
+    def fail(tenant):
+        raise RuntimeError('сбой')
+
+    poller = TenantPoller(tenants, fail, workers=1)
+    poller.add(1)
+    poller._heap.clear()
+
+    poll_now(poller, 1)
+
+    assert scheduled(poller) == [1]
+
+
+def test_unregistered_tenant_leaves_schedule(tenants):
+    """Отписавшийся студент выпадает из расписания и может вернуться."""
+    tenants.register(1, 'token', 0)
+    poller = TenantPoller(tenants, lambda tenant: None, workers=1)
+    poller.add(1)
+    poller._heap.clear()
+    tenants.unregister(1)
+
+    poll_now(poller, 1)
+
+    assert scheduled(poller) == []
+    poller.add(1)
+    assert scheduled(poller) == [1]
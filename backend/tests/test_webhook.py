@@ -0,0 +1,93 @@
+"""Приём обновлений через webhook."""
+import asyncio
+import json
+import socket
+
+import pytest
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from fake_telegram import make_update
+from webhook import SECRET_HEADER, WebhookServer
+
+SECRET = 'secret'
+
+
+def post_updates(server, *requests):
+    """Отправляет запросы на сервер и возвращает коды ответов."""
+    async def post():
+        async with TestClient(TestServer(server.app())) as client:
+            statuses = []
+            for secret, payload in requests:
+                response = await client.post(
+                    server.path, data=payload,
+                    headers={SECRET_HEADER: secret})
+                statuses.append(response.status)
+            # Даём очереди передать обновления обработчику
+            await asyncio.sleep(0.01)
+            return statuses
+    return asyncio.run(post())
+
+
+def fake_update(text):
+    """Возвращает тело запроса с обновлением от имитации Telegram."""
+    return json.dumps(make_update(text))
+
+
+def test_update_with_secret_reaches_handlers():
+    """Обновление с верным секретом передаётся обработчикам."""
+    received = []
+
+    async def process_updates(updates):
+        received.extend(updates)
+
+    server = WebhookServer(process_updates, SECRET)
+
+    assert post_updates(server, (SECRET, fake_update('/status'))) == [200]
+    assert [update.message.text for update in received] == ['/status']
+
+
+def test_wrong_secret_is_forbidden():
+    """Запрос без верного секрета отклоняется и не обрабатывается."""
+    received = []
+    server = WebhookServer(received.extend, SECRET)
+
+    statuses = post_updates(
+        server, ('wrong', fake_update('/status')), ('', fake_update('/a')))
+
+    assert statuses == [403, 403]
+    assert received == []
+
+
+def test_invalid_body_is_rejected():
+    """Тело не в JSON получает 400."""
+    server = WebhookServer(lambda updates: None, SECRET)
+
+    assert post_updates(server, (SECRET, 'not json')) == [400]
+
+
+def test_full_queue_sheds_updates():
+    """При полной очереди Telegram получает 503."""
+    release = asyncio.Event()
+
+    async def process_updates(updates):
+        await release.wait()
+
+    server = WebhookServer(process_updates, SECRET, queue_size=1)
+
+    statuses = post_updates(
+        server, *[(SECRET, fake_update('/status'))] * 3)
+
+    assert statuses == [200, 200, 503]
+
+
+def test_busy_port_fails_in_caller():
+    """Занятый порт даёт ошибку при запуске, а не в фоновом потоке."""
+    server = WebhookServer(lambda updates: None, SECRET)
+    with socket.socket() as busy:
+        busy.bind(('127.0.0.1', 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+
+        with pytest.raises(OSError):
+            server.start_in_thread('127.0.0.1', port)
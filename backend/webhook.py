@@ -0,0 +1,139 @@
+"""
+Приём обновлений Telegram через webhook.
+
+Встроенный aiohttp-сервер принимает POST от Telegram, сверяет заголовок
+X-Telegram-Bot-Api-Secret-Token и кладёт обновление в ограниченную
+очередь. Обработчики вызываются отдельно от приёма, поэтому ответ
+Telegram не ждёт их выполнения. При переполненной очереди сервер
+отвечает 503, и Telegram повторит доставку позже.
+"""
+import asyncio
+import hmac
+import logging
+import threading
+
+from aiohttp import web
+from telebot import types
+
+from metrics import REGISTRY
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    'webhook_queue_depth', 'Обновления, ожидающие обработчиков.')
+RECEIVED = REGISTRY.counter(
+    'webhook_updates_total', 'Обновления, принятые через webhook.')
+REJECTED = REGISTRY.counter(
+    'webhook_rejected_total',
+    'Запросы webhook с неверным секретом или телом.')
+SHED = REGISTRY.counter(
+    'webhook_shed_total', 'Обновления, отклонённые из-за полной очереди.')
+
+
+class WebhookServer:
+    """HTTP-сервер webhook с очередью перед обработчиками."""
+
+    def __init__(self, process_updates, secret_token, path='/telegram',
+                 queue_size=1000, batch_size=100):
+        """
+        Создаёт сервер; process_updates получает список Update.
+
+        process_updates может быть обычной функцией или корутиной.
+        """
+        self.process_updates = process_updates
+        self.secret_token = secret_token
+        self.path = path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._queue = None
+        self._consumer = None
+        self._runner = None
+
+    def app(self):
+        """Возвращает приложение aiohttp, в том числе для тестов."""
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app):
+        self._queue = asyncio.Queue(self.queue_size)
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def _on_cleanup(self, app):
+        self._consumer.cancel()
+
+    async def handle(self, request):
+        """Принимает одно обновление от Telegram."""
+        secret = request.headers.get(SECRET_HEADER, '').encode()
+        if not hmac.compare_digest(secret, self.secret_token.encode()):
+            REJECTED.inc()
+            return web.Response(status=403)
+        try:
+            update = await request.json()
+        except ValueError:
+            REJECTED.inc()
+            return web.Response(status=400)
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            SHED.inc()
+            return web.Response(status=503)
+        RECEIVED.inc()
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return web.Response()
+
+    async def _consume(self):
+        """Передаёт обновления обработчикам пачками."""
+        is_async = asyncio.iscoroutinefunction(self.process_updates)
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                updates = [types.Update.de_json(update) for update in batch]
+                if is_async:
+                    await self.process_updates(updates)
+                else:
+                    await loop.run_in_executor(
+                        None, self.process_updates, updates)
+            except Exception as error:
+                logging.error(f'Ошибка обработки обновлений: {error}')
+
+    async def start(self, host, port):
+        """Запускает сервер в работающем цикле событий."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logging.info(f'Webhook слушает {host}:{port}{self.path}')
+
+    async def stop(self):
+        """Останавливает сервер и приём обновлений."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def start_in_thread(self, host, port):
+        """
+        Начинает слушать порт и обслуживает запросы в фоновом потоке.
+
+        Порт занимается в вызывающем потоке, поэтому ошибка запуска
+        выбрасывается отсюда, до регистрации webhook в Telegram.
+        """
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.start(host, port))
+        except BaseException:
+            loop.run_until_complete(self.stop())
+            loop.close()
+            raise
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            loop.run_forever()
+
+        thread = threading.Thread(target=serve, name='webhook', daemon=True)
+        thread.start()
+        return thread